@@ -0,0 +1,89 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import (BaseAuthentication,
+                                           get_authorization_header)
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.tokens import REVOKED, current_token_version
+
+User = get_user_model()
+
+ROLE_CLAIM = 'role'
+SUPERUSER_CLAIM = 'is_superuser'
+VERSION_CLAIM = 'ver'
+# request.auth для запроса с токеном METRICS_TOKEN
+METRICS_AUTH = 'metrics'
+
+
+def access_token_for(user):
+    """Токен доступа с ролью пользователя и версией его токенов."""
+    token = AccessToken.for_user(user)
+    token[ROLE_CLAIM] = user.role
+    token[SUPERUSER_CLAIM] = user.is_superuser
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя из базы.
+
+    Права проверяются по роли из токена, строка пользователя загружается,
+    только если понадобятся другие поля. Токен принимается, пока его
+    версия совпадает с текущей версией пользователя (users/tokens.py).
+    Токены без роли обрабатываются как раньше.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed(
+                'Токен не содержит идентификатора пользователя',
+                code='token_not_valid'
+            )
+        version = current_token_version(user_id)
+        if version == REVOKED:
+            raise AuthenticationFailed(
+                'Пользователь не найден или заблокирован',
+                code='user_not_found'
+            )
+        if version != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                'Токен отозван, получите новый', code='token_revoked'
+            )
+        return User.from_token(
+            user_id,
+            validated_token[ROLE_CLAIM],
+            validated_token[SUPERUSER_CLAIM]
+        )
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Статический токен METRICS_TOKEN для сборщика метрик.
+
+    Заголовок `Authorization: Bearer <METRICS_TOKEN>` принимается без
+    пользователя: request.auth равен METRICS_AUTH. Другие токены
+    передаются следующему классу аутентификации.
+    """
+
+    def authenticate(self, request):
+        token = settings.METRICS_TOKEN
+        if not token:
+            return None
+        expected = f'Bearer {token}'.encode('utf-8')
+        if not hmac.compare_digest(get_authorization_header(request),
+                                   expected):
+            return None
+        return AnonymousUser(), METRICS_AUTH
+
+    def authenticate_header(self, request):
+        # Без заголовка WWW-Authenticate DRF ответил бы 403 вместо 401
+        return 'Bearer realm="api"'
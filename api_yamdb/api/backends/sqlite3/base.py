@@ -0,0 +1,41 @@
+"""SQLite с выбором режима транзакций.
+
+Django 3.2 открывает транзакцию командой BEGIN (DEFERRED): блокировка на
+запись берётся только при первой записи. Если транзакция сначала читает
+(например, `genre.set()` при создании произведения или каскадное
+удаление), повышение блокировки при чужой записи сразу завершается
+ошибкой "database is locked": busy_timeout здесь не помогает, потому что
+ожидание не спасло бы уже устаревший снимок чтения. С
+OPTIONS['transaction_mode'] = 'IMMEDIATE' блокировка на запись берётся
+в начале atomic(), и конкурирующие транзакции ждут busy_timeout на BEGIN.
+Поведение повторяет одноимённую настройку Django 5.1.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'EXCLUSIVE', 'IMMEDIATE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    transaction_mode = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        transaction_mode = kwargs.pop('transaction_mode', None)
+        if (transaction_mode is not None
+                and transaction_mode.upper() not in TRANSACTION_MODES):
+            raise ImproperlyConfigured(
+                'OPTIONS["transaction_mode"] должен быть одним из '
+                f'{", ".join(TRANSACTION_MODES)}'
+            )
+        self.transaction_mode = transaction_mode
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        # Режим известен только после подключения: курсор открывается
+        # первым
+        cursor = self.cursor()
+        if self.transaction_mode is None:
+            cursor.execute('BEGIN')
+        else:
+            cursor.execute(f'BEGIN {self.transaction_mode}')
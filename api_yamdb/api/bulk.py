@@ -0,0 +1,106 @@
+"""Массовое создание произведений для `POST /api/v1/titles/bulk/`."""
+from django.db import transaction
+from rest_framework import serializers
+
+from api.cache import invalidate_catalogue
+from reviews.models import Category, Genre, Title
+from reviews.search import get_backend
+from reviews.trigrams import loaded_index
+from .serializers import TitleBulkItemSerializer
+
+BULK_MAX_ITEMS = 5000
+BATCH_SIZE = 500
+
+DOES_NOT_EXIST = serializers.SlugRelatedField.default_error_messages[
+    'does_not_exist'
+]
+
+
+def slug_error(slug):
+    return DOES_NOT_EXIST.format(slug_name='slug', value=slug)
+
+
+def validate_items(items):
+    """Проверяет элементы, возвращает (индекс, данные) и ошибки.
+
+    Все slug категорий и жанров разрешаются двумя запросами на всю пачку.
+    """
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        serializer = TitleBulkItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+    categories = Category.objects.in_bulk(
+        {data['category'] for _, data in valid}, field_name='slug'
+    )
+    genres = Genre.objects.in_bulk(
+        {slug for _, data in valid for slug in data['genre']},
+        field_name='slug'
+    )
+    resolved = []
+    for index, data in valid:
+        item_errors = {}
+        if data['category'] not in categories:
+            item_errors['category'] = [slug_error(data['category'])]
+        missing = [slug for slug in data['genre'] if slug not in genres]
+        if missing:
+            item_errors['genre'] = [slug_error(slug) for slug in missing]
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+            continue
+        data['category'] = categories[data['category']]
+        data['genre'] = [genres[slug] for slug in dict.fromkeys(data['genre'])]
+        resolved.append((index, data))
+    errors.sort(key=lambda error: error['index'])
+    return resolved, errors
+
+
+def insert_titles(titles):
+    """bulk_create с получением id созданных строк.
+
+    Django 3.2 возвращает id из bulk_create только на PostgreSQL. На SQLite
+    запись блокирует всю базу до конца транзакции, поэтому вставленные
+    строки - последние по id.
+    """
+    Title.objects.bulk_create(titles, batch_size=BATCH_SIZE)
+    if titles and titles[0].pk is None:
+        ids = Title.objects.order_by('-id').values_list(
+            'id', flat=True
+        )[:len(titles)]
+        for title, title_id in zip(titles, reversed(ids)):
+            title.pk = title_id
+
+
+def create_titles(items):
+    """Создаёт корректные произведения, возвращает созданные и ошибки."""
+    resolved, errors = validate_items(items)
+    if not resolved:
+        return [], errors
+    titles = [
+        Title(**{key: value for key, value in data.items() if key != 'genre'})
+        for _, data in resolved
+    ]
+    through = Title.genre.through
+    with transaction.atomic():
+        insert_titles(titles)
+        through.objects.bulk_create(
+            [
+                through(title_id=title.pk, genre_id=genre.pk)
+                for title, (_, data) in zip(titles, resolved)
+                for genre in data['genre']
+            ],
+            batch_size=BATCH_SIZE
+        )
+        get_backend().index_titles(title.pk for title in titles)
+        transaction.on_commit(invalidate_catalogue)
+    trigram_index = loaded_index()
+    if trigram_index is not None:
+        for title in titles:
+            trigram_index.add(title.pk, title.name)
+    created = [
+        {'index': index, 'id': title.pk}
+        for title, (index, _) in zip(titles, resolved)
+    ]
+    return created, errors
@@ -0,0 +1,40 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'catalogue:version'
+
+
+def get_cache():
+    return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+
+def catalogue_version():
+    """Текущее поколение кэша каталога.
+
+    Используется случайный токен, а не счётчик: если ключ версии вытеснен
+    из кэша, новое значение не совпадёт ни с одним из прежних.
+    """
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_catalogue():
+    """Делает недоступными все закэшированные ответы каталога."""
+    get_cache().set(VERSION_KEY, uuid4().hex, None)
+
+
+def catalogue_key(request):
+    url = request.build_absolute_uri()
+    return ':'.join((
+        'catalogue',
+        catalogue_version(),
+        request.accepted_renderer.format,
+        md5(url.encode('utf-8')).hexdigest(),
+    ))
@@ -0,0 +1,172 @@
+"""Быстрое чтение списков без экземпляров моделей и полей DRF.
+
+`CompiledSerializer` один раз на класс сериализатора сопоставляет его
+поля колонкам модели и затем строит ответ из строк values(): колонки
+превращаются в значения тем же to_representation, что и у полей DRF,
+поэтому JSON совпадает с обычным путём байт в байт. Связи многие ко
+многим читаются вторым запросом по id страницы, как prefetch_related.
+Сериализатор с полем, которое нельзя сопоставить колонке, не
+компилируется, и представление работает обычным путём.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def converter(field):
+    """Преобразование значения колонки так же, как в поле DRF."""
+    if type(field) in (serializers.CharField, serializers.SlugField,
+                       serializers.EmailField):
+        return str
+    if type(field) is serializers.IntegerField:
+        return int
+    return field.to_representation
+
+
+def scalar(column, convert):
+    if convert is None:
+        return lambda row, related: row[column]
+
+    def get(row, related):
+        value = row[column]
+        return None if value is None else convert(value)
+    return get
+
+
+def nested(column, plan):
+    def get(row, related):
+        return None if row[column] is None else plan.represent(row)
+    return get
+
+
+def many(name):
+    return lambda row, related: related[name].get(row['id'], [])
+
+
+class Plan:
+    """Поля сериализатора в терминах values().
+
+    `getters` - [(имя в ответе, функция от строки и связей)] в порядке
+    полей сериализатора, `columns` - колонки для values(), `many` -
+    [(имя, поле модели, план элемента или колонка slug)] для связей
+    многие ко многим.
+    """
+
+    def __init__(self, serializer, prefix=''):
+        meta = serializer.Meta.model._meta
+        self.getters, self.columns, self.many = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise NotCompilable(name)
+            column = f'{prefix}{model_field.name}'
+            if not model_field.is_relation:
+                self.columns.append(column)
+                getter = scalar(column, converter(field))
+            elif model_field.many_to_many and not prefix:
+                self.many.append((name, model_field, self.item(field)))
+                getter = many(name)
+            elif isinstance(field, serializers.SlugRelatedField):
+                self.columns.append(f'{column}__{field.slug_field}')
+                getter = scalar(self.columns[-1], None)
+            elif (isinstance(field, serializers.ModelSerializer)
+                    and not prefix):
+                plan = Plan(field, f'{column}__')
+                self.columns.extend([column, *plan.columns])
+                getter = nested(column, plan)
+            else:
+                raise NotCompilable(name)
+            self.getters.append((name, getter))
+
+    def item(self, field):
+        if isinstance(field, serializers.ManyRelatedField):
+            field = field.child_relation
+            if isinstance(field, serializers.SlugRelatedField):
+                return field.slug_field
+        elif isinstance(field, serializers.ListSerializer):
+            return Plan(field.child)
+        raise NotCompilable(field.field_name)
+
+    def represent(self, row, related=None):
+        return {name: get(row, related) for name, get in self.getters}
+
+
+class CompiledSerializer:
+
+    def __init__(self, serializer_class):
+        self.plan = Plan(serializer_class())
+        self.columns = list(dict.fromkeys(['id', *self.plan.columns]))
+
+    def values(self, queryset):
+        """Выборка строк для страницы; пагинация работает с ней как обычно."""
+        return queryset.select_related(None).prefetch_related(None).values(
+            *self.columns
+        )
+
+    def related(self, ids):
+        """Элементы связей многие ко многим по id: {поле: {id: [...]}}."""
+        related = {}
+        for name, model_field, item in self.plan.many:
+            key = model_field.related_query_name()
+            queryset = model_field.related_model.objects.filter(
+                **{f'{key}__in': ids}
+            )
+            items = related[name] = {}
+            if isinstance(item, Plan):
+                for row in queryset.values(key, *item.columns):
+                    items.setdefault(row[key], []).append(
+                        item.represent(row)
+                    )
+            else:
+                for owner, slug in queryset.values_list(key, item):
+                    items.setdefault(owner, []).append(slug)
+        return related
+
+    def represent(self, rows):
+        related = self.related([row['id'] for row in rows])
+        return [self.plan.represent(row, related) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """Скомпилированный сериализатор или None, если класс не поддержан."""
+    try:
+        return CompiledSerializer(serializer_class)
+    except NotCompilable:
+        return None
+
+
+class CompiledListMixin:
+    """list по values() для представлений с горячим чтением.
+
+    Выключается настройкой COMPILED_SERIALIZERS, а также при выборе
+    полей (`?fields=`, `?expand=`), где работает обычный путь.
+    """
+
+    def get_compiled_serializer(self):
+        if not settings.COMPILED_SERIALIZERS:
+            return None
+        sparse = getattr(self, 'get_sparse_selection', None)
+        if sparse is not None and sparse() is not None:
+            return None
+        return compile_serializer(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(compiled.represent(list(queryset)))
+        return self.get_paginated_response(compiled.represent(page))
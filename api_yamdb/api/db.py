@@ -0,0 +1,27 @@
+"""Настройка соединений с базой.
+
+Для SQLite при каждом новом соединении выполняются PRAGMA из
+SQLITE_PRAGMAS: журнал WAL позволяет читать во время записи, а
+busy_timeout заставляет писателя подождать блокировку вместо ошибки
+"database is locked". Постоянные соединения (CONN_MAX_AGE) с ключом
+CONN_HEALTH_CHECKS проверяются перед запросом, как в Django 4.1:
+оборвавшееся соединение закрывается и открывается заново.
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def configure_sqlite(connection):
+    # Напрямую через DB-API: служебные запросы не попадают в метрики
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections():
+    """Закрывает открытые постоянные соединения, которые не отвечают."""
+    for connection in connections.all():
+        if (connection.connection is not None
+                and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,128 @@
+"""Потоковая выгрузка каталога, отзывов и комментариев.
+
+Наборы данных называются так же, как CSV-файлы, которые читает
+csv-in-bd, а колонки CSV совпадают с полями моделей, поэтому выгрузка
+загружается обратно без преобразований. В NDJSON произведения
+дополнительно содержат slug категории, список slug жанров и рейтинг.
+Строки читаются курсором `iterator(chunk_size=...)`, и память не растёт
+с размером выгрузки.
+"""
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reviews.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Dataset:
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+
+    def rows(self):
+        """Словари с колонками CSV по возрастанию id."""
+        queryset = self.model._default_manager.order_by('pk').values_list(
+            *self.columns
+        )
+        for values in queryset.iterator(chunk_size=CHUNK_SIZE):
+            yield dict(zip(self.columns, values))
+
+    def records(self):
+        """Записи NDJSON, по умолчанию те же строки."""
+        return self.rows()
+
+
+class TitleDataset(Dataset):
+
+    def records(self):
+        queryset = Title.objects.order_by('pk').values_list(
+            *self.columns, 'category__slug', 'rating'
+        )
+        chunk = []
+        for values in queryset.iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(values)
+            if len(chunk) == CHUNK_SIZE:
+                yield from self.with_genres(chunk)
+                chunk = []
+        yield from self.with_genres(chunk)
+
+    def with_genres(self, chunk):
+        """Жанры подгружаются одним запросом на пачку: prefetch_related
+        в Django 3.2 не работает вместе с iterator()."""
+        if not chunk:
+            return
+        genres = {}
+        links = Title.genre.through.objects.filter(
+            title_id__in=[values[0] for values in chunk]
+        ).order_by('genre__slug').values_list('title_id', 'genre__slug')
+        for title_id, slug in links:
+            genres.setdefault(title_id, []).append(slug)
+        for *values, category, rating in chunk:
+            record = dict(zip(self.columns, values))
+            record.update(
+                category=category,
+                genre=genres.get(record['id'], []),
+                rating=rating,
+            )
+            yield record
+
+
+DATASETS = {
+    'users': Dataset(User, (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    )),
+    'category': Dataset(Category, ('id', 'name', 'slug')),
+    'genre': Dataset(Genre, ('id', 'name', 'slug')),
+    'titles': TitleDataset(Title, (
+        'id', 'name', 'year', 'description', 'category_id'
+    )),
+    'genre_title': Dataset(
+        Title.genre.through, ('id', 'title_id', 'genre_id')
+    ),
+    'review': Dataset(Review, (
+        'id', 'title_id', 'text', 'author_id', 'score', 'pub_date'
+    )),
+    'comments': Dataset(Comment, (
+        'id', 'review_id', 'text', 'author_id', 'pub_date'
+    )),
+}
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(dataset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(dataset.columns)
+    for row in dataset.rows():
+        yield writer.writerow(row.values())
+
+
+def ndjson_lines(dataset):
+    for record in dataset.records():
+        yield json.dumps(
+            record, ensure_ascii=False, cls=DjangoJSONEncoder
+        ) + '\n'
+
+
+def export_lines(name, output_format):
+    dataset = DATASETS[name]
+    if output_format == 'csv':
+        return csv_lines(dataset)
+    return ndjson_lines(dataset)
@@ -0,0 +1,41 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список slug проверяется одним запросом, а не запросом на элемент."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        for item in data:
+            if not isinstance(item, (str, int)):
+                child.fail('invalid')
+        objects = child.get_queryset().in_bulk(
+            {str(item) for item in data}, field_name=child.slug_field
+        )
+        for item in data:
+            if str(item) not in objects:
+                child.fail(
+                    'does_not_exist', slug_name=child.slug_field,
+                    value=str(item)
+                )
+        return [objects[str(item)] for item in data]
+
+
+class SlugListRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который при many=True проверяет список пачкой.
+
+    slug_field должен быть уникальным полем модели.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
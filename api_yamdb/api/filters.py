@@ -1,26 +1,179 @@
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
 
 from reviews.models import Title
+from reviews.search import get_backend, search_terms
+from reviews.trigrams import get_index
+
+YEAR_DIGITS = 4
+LEGACY_MATCH = 'legacy'
+FUZZY_MATCH = 'fuzzy'
+FUZZY_LIMIT = 100
+
+
+def prefix_range(value):
+    """Границы [начало, конец) строк, начинающихся с `value`.
+
+    Поиск по префиксу через сравнение, а не LIKE, использует обычный
+    B-tree индекс на любой СУБД.
+    """
+    return value, value[:-1] + chr(ord(value[-1]) + 1)
+
+
+def year_prefix_q(prefix):
+    """Условие на годы, запись которых начинается с `prefix`.
+
+    Для каждой возможной длины года префикс превращается в диапазон:
+    `19` -> 19, 190..199, 1900..1999. Годы записываются без ведущих
+    нулей, поэтому `0` - это только нулевой год.
+    """
+    if prefix == '0':
+        return Q(year=0)
+    condition = Q()
+    number = int(prefix)
+    for digits in range(len(prefix), YEAR_DIGITS + 1):
+        scale = 10 ** (digits - len(prefix))
+        condition |= Q(
+            year__gte=number * scale, year__lt=(number + 1) * scale
+        )
+    return condition
+
+
+def distinct(queryset, name):
+    """Убирает повторы, если фильтр идёт через связь многие-ко-многим."""
+    field = queryset.model._meta.get_field(name.split('__')[0])
+    return queryset.distinct() if field.many_to_many else queryset
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
 
 
 class TitleFilter(filters.FilterSet):
+    """Фильтры произведений.
+
+    `category`, `genre` и `year` сравниваются точно и используют индексы,
+    `genre` принимает несколько slug через запятую. Для поиска по началу
+    значения есть `*_prefix`, для диапазона лет - `year_min`/`year_max`.
+    Прежнее поведение (вхождение подстроки) включается `match=legacy`,
+    `match=fuzzy` ищет `name` с опечатками по триграммному индексу
+    и сортирует результат по сходству.
+    """
+    match = filters.ChoiceFilter(
+        choices=(
+            (LEGACY_MATCH, 'Поиск вхождения подстроки'),
+            (FUZZY_MATCH, 'Нечёткий поиск по названию'),
+        ),
+        method='filter_match'
+    )
     category = filters.CharFilter(
         field_name='category__slug',
-        lookup_expr='icontains'
+        method='filter_exact'
+    )
+    category_prefix = filters.CharFilter(
+        field_name='category__slug',
+        method='filter_prefix'
+    )
+    genre = CharInFilter(
+        field_name='genre__slug',
+        method='filter_exact'
     )
-    genre = filters.CharFilter(
+    genre_prefix = filters.CharFilter(
         field_name='genre__slug',
-        lookup_expr='icontains'
+        method='filter_prefix'
     )
     name = filters.CharFilter(
         field_name='name',
-        lookup_expr='icontains'
+        method='filter_name'
     )
     year = filters.NumberFilter(
         field_name='year',
-        lookup_expr='icontains'
+        method='filter_exact'
+    )
+    year_prefix = filters.CharFilter(
+        field_name='year',
+        method='filter_year_prefix'
+    )
+    year_min = filters.NumberFilter(
+        field_name='year',
+        lookup_expr='gte'
+    )
+    year_max = filters.NumberFilter(
+        field_name='year',
+        lookup_expr='lte'
     )
 
     class Meta:
         model = Title
         fields = '__all__'
+
+    @property
+    def legacy(self):
+        return self.form.cleaned_data.get('match') == LEGACY_MATCH
+
+    def filter_match(self, queryset, name, value):
+        return queryset
+
+    def filter_name(self, queryset, name, value):
+        if self.form.cleaned_data.get('match') != FUZZY_MATCH:
+            return queryset.filter(**{f'{name}__icontains': value})
+        ranked = [
+            title_id
+            for title_id, _ in get_index().search(value, limit=FUZZY_LIMIT)
+        ]
+        if not ranked:
+            return queryset.none()
+        return queryset.filter(id__in=ranked).order_by(Case(
+            *(
+                When(id=title_id, then=position)
+                for position, title_id in enumerate(ranked)
+            ),
+            output_field=IntegerField()
+        ))
+
+    def filter_exact(self, queryset, name, value):
+        values = value if isinstance(value, list) else [value]
+        if self.legacy:
+            condition = Q()
+            for item in values:
+                condition |= Q(**{f'{name}__icontains': item})
+            return distinct(queryset.filter(condition), name)
+        if len(values) == 1:
+            return queryset.filter(**{name: values[0]})
+        return distinct(queryset.filter(**{f'{name}__in': values}), name)
+
+    def filter_prefix(self, queryset, name, value):
+        start, end = prefix_range(value)
+        return distinct(
+            queryset.filter(**{f'{name}__gte': start, f'{name}__lt': end}),
+            name
+        )
+
+    def filter_year_prefix(self, queryset, name, value):
+        # Префикс длиннее года или с ведущим нулём не совпадёт ни с одним
+        # годом; пустое условие year_prefix_q вернуло бы все произведения
+        if (not value.isascii() or not value.isdigit()
+                or len(value) > YEAR_DIGITS
+                or value.startswith('0') and value != '0'):
+            return queryset.none()
+        return queryset.filter(year_prefix_q(value))
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Поиск произведений по названию и описанию через `?search=`.
+
+    Использует полнотекстовый индекс вместо `icontains`.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param)
+        if query is None:
+            return queryset
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        sql, params = get_backend().title_ids_sql(terms)
+        return queryset.filter(id__in=RawSQL(sql, params))
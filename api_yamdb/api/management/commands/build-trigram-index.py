@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews.trigrams import build_index, reset_index
+
+
+class Command(BaseCommand):
+    help = 'Строит триграммный индекс названий и сохраняет его в файл'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=settings.TRIGRAM_INDEX_PATH,
+            help='Файл индекса'
+        )
+
+    def handle(self, *args, **options):
+        index = build_index()
+        index.dump(options['path'])
+        reset_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Триграммный индекс сохранён: {len(index)} произведений'
+        ))
@@ -1,8 +1,12 @@
-import csv
+import os
 
-from django.core.management.base import BaseCommand
-from django.db import connection
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError
 
+from api.management.importer import (BATCH_SIZE, CsvImporter,
+                                     StagingCsvImporter, UpsertCsvImporter,
+                                     load_in_parallel)
 from api_yamdb.settings import BASE_DIR
 from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import User
@@ -16,53 +20,116 @@ models = {
     Title: 'titles.csv',
     Review: 'review.csv',
     Comment: 'comments.csv',
+    Title.genre.through: 'genre_title.csv',
 }
+PROGRESS_EVERY = 100_000
 
 
 class Command(BaseCommand):
     help = 'Команда для автоматического наполнения базы данных'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=path,
+            help='Каталог с CSV-файлами'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк, записываемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Обновлять существующие строки вместо ошибки по ключу'
+        )
+        parser.add_argument(
+            '--deferred-checks',
+            action='store_true',
+            help='Грузить через временную таблицу и проверять внешние ключи '
+                 'и уникальность один раз в конце'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество потоков для параллельной загрузки таблиц'
+        )
+
     def handle(self, *args, **options):
-        self.all_models(self, *args)
-        self.reviews_title_genre(self, *args)
+        if options['upsert'] and options['deferred_checks']:
+            raise CommandError(
+                '--upsert и --deferred-checks нельзя использовать вместе'
+            )
+        importer_class = CsvImporter
+        if options['upsert']:
+            importer_class = UpsertCsvImporter
+        elif options['deferred_checks']:
+            importer_class = StagingCsvImporter
+
+        def load(model):
+            self.load(
+                importer_class,
+                model,
+                os.path.join(options['path'], models[model]),
+                options['batch_size']
+            )
+
+        if options['workers'] > 1:
+            load_in_parallel(models, load, options['workers'])
+        else:
+            for model in models:
+                load(model)
+        call_command('rebuild-ratings', stdout=self.stdout)
+        call_command('rebuild-search-index', stdout=self.stdout)
+        call_command('build-trigram-index', stdout=self.stdout)
+
+    def load(self, importer_class, model, file_path, batch_size):
+        try:
+            importer = importer_class(
+                model,
+                file_path,
+                batch_size=batch_size,
+                on_error=self.report_error(file_path),
+                on_progress=self.report_progress(),
+            )
+        except NotSupportedError as error:
+            raise CommandError(error)
+        try:
+            stats = importer.run()
+        except OSError as error:
+            self.stdout.write(
+                self.style.ERROR(f'Ошибка {error} при чтении {file_path}')
+            )
+            return
+        style = self.style.WARNING if stats.errors else self.style.SUCCESS
+        self.stdout.write(style(
+            f'База заполнена ({stats.label}): записано {stats.created} '
+            f'из {stats.rows}, ошибок {stats.errors}, '
+            f'{stats.rate:.0f} строк/с'
+        ))
+
+    def report_error(self, file_path):
+        file_name = os.path.basename(file_path)
+
+        def on_error(line, error):
+            self.stdout.write(
+                self.style.ERROR(f'Ошибка {error} в {file_name}:{line}')
+            )
+        return on_error
 
-    def all_models(self, *args):
-        for model, csv_file in models.items():
-            with open(path + '/' + csv_file, 'r', encoding='utf-8') as file:
-                try:
-                    rows = csv.DictReader(file)
-                    records = [model(**row) for row in rows]
-                    model.objects.bulk_create(records)
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'База заполнена (модель {model.__name__})'
-                        )
-                    )
-                except Exception as error:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f'Ошибка {error} при записи {model.__name__}'
-                        )
-                    )
+    def report_progress(self):
+        reported_step = 0
 
-    def reviews_title_genre(self, *args):
-        with open(path + '/genre_title.csv', 'r', encoding='utf-8') as file:
-            try:
-                rows = csv.reader(file)
-                records = [tuple(row) for row in rows][1:]
-                with connection.cursor() as cur:
-                    cur.executemany(
-                        'INSERT INTO reviews_title_genre VALUES (%s, %s, %s)',
-                        records
-                    )
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            'База заполнена (reviews_title_genre)'
-                        )
-                    )
-            except Exception as error:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Ошибка {error} при записи из genre_title.csv'
-                    )
-                )
+        def on_progress(stats):
+            nonlocal reported_step
+            step = stats.rows // PROGRESS_EVERY
+            if step == reported_step:
+                return
+            reported_step = step
+            self.stdout.write(
+                f'{stats.label}: {stats.rows} строк, {stats.rate:.0f} строк/с'
+            )
+        return on_progress
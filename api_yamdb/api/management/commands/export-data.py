@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.export import DATASETS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = ('Выгружает данные в CSV или NDJSON; CSV-выгрузка загружается '
+            'обратно командой csv-in-bd')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            required=True,
+            help='Каталог для файлов выгрузки'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='csv',
+            help='Формат файлов'
+        )
+        parser.add_argument(
+            '--dataset',
+            action='append',
+            choices=list(DATASETS),
+            help='Набор данных; можно указать несколько раз, по умолчанию '
+                 'выгружаются все'
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['path'], exist_ok=True)
+        for name in options['dataset'] or DATASETS:
+            file_path = os.path.join(
+                options['path'], f'{name}.{options["format"]}'
+            )
+            rows = 0
+            with open(file_path, 'w', encoding='utf-8', newline='') as file:
+                for line in export_lines(name, options['format']):
+                    file.write(line)
+                    rows += 1
+            if options['format'] == 'csv':
+                rows -= 1
+            self.stdout.write(self.style.SUCCESS(
+                f'Выгружено {name}: {rows} строк в {file_path}'
+            ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate_catalogue
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает хранимый рейтинг произведений по отзывам'
+
+    def handle(self, *args, **options):
+        updated = Title.objects.rebuild_ratings()
+        invalidate_catalogue()
+        self.stdout.write(
+            self.style.SUCCESS(f'Рейтинг пересчитан ({updated} произведений)')
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reviews.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт полнотекстовый индекс произведений и отзывов'
+
+    def handle(self, *args, **options):
+        get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересоздан'))
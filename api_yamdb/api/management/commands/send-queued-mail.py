@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.mail import process_queue
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MAIL_QUEUE_BATCH_SIZE,
+            help='Количество писем, отправляемых через одно соединение'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а проверять очередь каждые --interval с'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между проверками очереди в режиме --loop, с'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            claimed, sent = process_queue(options['batch_size'])
+            if claimed:
+                style = (
+                    self.style.SUCCESS if sent == claimed
+                    else self.style.WARNING
+                )
+                self.stdout.write(style(
+                    f'Отправлено писем: {sent} из {claimed}'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,443 @@
+import csv
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import (DatabaseError, NotSupportedError, connection,
+                       connections, transaction)
+from django.db.models import CharField, TextField, UniqueConstraint
+
+BATCH_SIZE = 1000
+
+# Ошибки, из-за которых строка отбрасывается, а загрузка продолжается
+ROW_ERRORS = (DatabaseError, TypeError, ValueError, ValidationError)
+
+
+def read_rows(file_path):
+    """Лениво читает CSV, возвращая пары (номер строки, словарь)."""
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def nullable_columns(model):
+    """Колонки, в которых пустая строка CSV означает NULL."""
+    return {
+        name
+        for field in model._meta.concrete_fields
+        if field.null and not isinstance(field, (CharField, TextField))
+        for name in (field.name, field.attname)
+    }
+
+
+def prepare_values(obj, fields):
+    """Значения полей объекта в виде, готовом для SQL-запроса."""
+    values = []
+    for field in fields:
+        value = getattr(obj, field.attname)
+        if value is None:
+            value = field.pre_save(obj, add=True)
+        values.append(field.get_db_prep_save(value, connection))
+    return values
+
+
+def dependency_graph(models):
+    """Для каждой модели - модели из `models`, на которые она ссылается."""
+    return {
+        model: {
+            field.related_model
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in models
+            and field.related_model is not model
+        }
+        for model in models
+    }
+
+
+def load_in_parallel(models, load, workers):
+    """Вызывает `load(model)` в пуле потоков с учётом внешних ключей.
+
+    Модель уходит в работу, как только загружены все модели, на которые
+    она ссылается; независимые таблицы грузятся одновременно. У каждого
+    потока своё подключение к БД, оно закрывается по завершении задачи.
+    """
+    graph = dependency_graph(models)
+    done = set()
+    pending = {}
+
+    def run(model):
+        try:
+            return load(model)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while graph or pending:
+            ready = [model for model, deps in graph.items() if deps <= done]
+            for model in ready:
+                del graph[model]
+                pending[executor.submit(run, model)] = model
+            if not pending:
+                raise ValueError(
+                    'Циклическая зависимость между моделями: '
+                    + ', '.join(model.__name__ for model in graph)
+                )
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done.add(pending.pop(future))
+                future.result()
+
+
+class ImportStats:
+    """Счётчики загрузки одного файла."""
+
+    def __init__(self, label):
+        self.label = label
+        self.rows = 0
+        self.created = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class CsvImporter:
+    """Потоковая загрузка CSV-файла в модель.
+
+    Строки читаются лениво и сохраняются пачками по `batch_size`, каждая
+    пачка - в своей транзакции. Если пачка не записалась, она повторяется
+    построчно, чтобы отбросить только ошибочные строки и сообщить о них
+    через `on_error(line, error)`.
+    """
+
+    def __init__(self, model, file_path, batch_size=BATCH_SIZE,
+                 on_error=None, on_progress=None):
+        self.model = model
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.nullable = nullable_columns(model)
+
+    def batches(self):
+        rows = read_rows(self.file_path)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def run(self):
+        stats = ImportStats(self.model._meta.db_table)
+        for batch in self.batches():
+            stats.rows += len(batch)
+            stats.created += self.load_batch(batch, stats)
+            if self.on_progress is not None:
+                self.on_progress(stats)
+        return stats
+
+    def build(self, batch, stats):
+        objs = []
+        for line, row in batch:
+            for name in self.nullable.intersection(row):
+                if row[name] == '':
+                    row[name] = None
+            try:
+                objs.append((line, self.model(**row)))
+            except ROW_ERRORS as error:
+                self.report(line, error, stats)
+        return objs
+
+    def insert(self, objs, suffix=''):
+        """Многострочный INSERT значений из `prepare_values`.
+
+        В отличие от bulk_create, значения из CSV не перезаписываются
+        pre_save: pub_date с auto_now_add сохраняет дату из файла и
+        заполняется текущим временем, только если её там нет. Колонка
+        первичного ключа пропускается, если id нет ни у одной строки.
+        """
+        if not objs:
+            return
+        opts = self.model._meta
+        fields = [
+            field for field in opts.concrete_fields
+            if not field.primary_key
+            or any(obj.pk is not None for obj in objs)
+        ]
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        batch_size = connection.ops.bulk_batch_size(fields, objs)
+        with connection.cursor() as cursor:
+            for start in range(0, len(objs), batch_size):
+                chunk = objs[start:start + batch_size]
+                placeholders = ', '.join(
+                    '(' + ', '.join(['%s'] * len(fields)) + ')'
+                    for _ in chunk
+                )
+                cursor.execute(
+                    f'INSERT INTO {quote(opts.db_table)} ({columns}) '
+                    f'VALUES {placeholders} {suffix}',
+                    [
+                        value
+                        for obj in chunk
+                        for value in prepare_values(obj, fields)
+                    ]
+                )
+
+    def save(self, objs):
+        self.insert(objs)
+
+    def load_batch(self, batch, stats):
+        objs = self.build(batch, stats)
+        try:
+            with transaction.atomic():
+                self.save([obj for _, obj in objs])
+        except ROW_ERRORS:
+            return self.load_rows(objs, stats)
+        return len(objs)
+
+    def load_rows(self, objs, stats):
+        created = 0
+        for line, obj in objs:
+            try:
+                with transaction.atomic():
+                    self.save([obj])
+            except ROW_ERRORS as error:
+                self.report(line, error, stats)
+            else:
+                created += 1
+        return created
+
+    def report(self, line, error, stats):
+        stats.errors += 1
+        if self.on_error is not None:
+            self.on_error(line, error)
+
+
+class UpsertCsvImporter(CsvImporter):
+    """Загрузка с обновлением уже существующих строк.
+
+    Django 3.2 не поддерживает `bulk_create(update_conflicts=...)`, поэтому
+    пачка пишется одним `INSERT ... ON CONFLICT (pk) DO UPDATE`: повторный
+    прогон того же файла обновляет данные, а не падает на ключах.
+    Обновляются только колонки, присутствующие в CSV.
+
+    Конфликт определяется только по первичному ключу. Строка с новым id,
+    но уже занятым уникальным значением (username, email, slug), не
+    обновляет существующую запись: пачка с ней повторяется построчно, и
+    строка попадает в ошибки через `on_error`.
+    """
+    vendors = ('sqlite', 'postgresql')
+
+    def __init__(self, *args, **kwargs):
+        if connection.vendor not in self.vendors:
+            raise NotSupportedError(
+                f'Режим upsert не поддерживается для {connection.vendor}'
+            )
+        super().__init__(*args, **kwargs)
+        self.csv_columns = set()
+
+    def build(self, batch, stats):
+        for _, row in batch:
+            self.csv_columns.update(row)
+        return super().build(batch, stats)
+
+    def save(self, objs):
+        opts = self.model._meta
+        quote = connection.ops.quote_name
+        updates = ', '.join(
+            f'{quote(field.column)} = excluded.{quote(field.column)}'
+            for field in opts.concrete_fields
+            if not field.primary_key
+            and {field.name, field.attname} & self.csv_columns
+        )
+        action = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+        self.insert(
+            objs, f'ON CONFLICT ({quote(opts.pk.column)}) {action}'
+        )
+
+
+class StagingCsvImporter(CsvImporter):
+    """Загрузка через промежуточную таблицу с проверкой в конце.
+
+    Строки пишутся во временную таблицу без ограничений и индексов.
+    После чтения файла NOT NULL, CHECK полей, внешние ключи и уникальность
+    проверяются несколькими запросами над всей таблицей, нарушающие строки
+    помечаются и попадают в отчёт, остальные переносятся одним
+    `INSERT ... SELECT`.
+    """
+    line_column = 'import_line'
+    error_column = 'import_error'
+    # Проверка читает целевые таблицы, а перенос затем пишет в них. В SQLite
+    # такая транзакция не ждёт блокировку записи, занятую другим потоком, а
+    # сразу падает с "database is locked", поэтому при параллельной
+    # загрузке (--workers) этот шаг выполняется по очереди
+    publish_lock = threading.Lock()
+
+    def run(self):
+        stats = ImportStats(self.model._meta.db_table)
+        opts = self.model._meta
+        self.fields = opts.concrete_fields
+        quote = connection.ops.quote_name
+        self.table = quote(opts.db_table)
+        self.staging = quote(f'staging_{opts.db_table}')
+        with connection.cursor() as cursor:
+            self.create_staging(cursor)
+            try:
+                for batch in self.batches():
+                    stats.rows += len(batch)
+                    self.stage_batch(cursor, batch, stats)
+                    if self.on_progress is not None:
+                        self.on_progress(stats)
+                with self.publish_lock, transaction.atomic():
+                    self.validate(cursor)
+                    for line, error in self.violations(cursor):
+                        self.report(line, error, stats)
+                    stats.created += self.publish(cursor)
+            finally:
+                cursor.execute(f'DROP TABLE {self.staging}')
+        return stats
+
+    def create_staging(self, cursor):
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {self.staging} AS '
+            f'SELECT * FROM {self.table} WHERE 1 = 0'
+        )
+        cursor.execute(
+            f'ALTER TABLE {self.staging} ADD COLUMN {self.line_column} integer'
+        )
+        cursor.execute(
+            f'ALTER TABLE {self.staging} ADD COLUMN {self.error_column} '
+            f'varchar(255)'
+        )
+
+    def stage_batch(self, cursor, batch, stats):
+        rows = []
+        for line, obj in self.build(batch, stats):
+            try:
+                rows.append([*prepare_values(obj, self.fields), line])
+            except ROW_ERRORS as error:
+                self.report(line, error, stats)
+        columns = ', '.join(
+            [self.column(field) for field in self.fields] + [self.line_column]
+        )
+        placeholders = ', '.join(['%s'] * (len(self.fields) + 1))
+        cursor.executemany(
+            f'INSERT INTO {self.staging} ({columns}) '
+            f'VALUES ({placeholders})',
+            rows
+        )
+
+    def staging_index(self, index):
+        return connection.ops.quote_name(
+            f'staging_{self.model._meta.db_table}_{index}'
+        )
+
+    def column(self, field, alias=None):
+        column = connection.ops.quote_name(field.column)
+        return f'{alias}.{column}' if alias else column
+
+    def unique_sets(self):
+        opts = self.model._meta
+        sets = [(field,) for field in self.fields if field.unique]
+        sets.extend(
+            tuple(opts.get_field(name) for name in names)
+            for names in opts.unique_together
+        )
+        sets.extend(
+            tuple(opts.get_field(name) for name in constraint.fields)
+            for constraint in opts.constraints
+            if isinstance(constraint, UniqueConstraint)
+            and constraint.condition is None
+        )
+        return sets
+
+    def mark(self, cursor, error, condition):
+        cursor.execute(
+            f'UPDATE {self.staging} SET {self.error_column} = %s '
+            f'WHERE {self.error_column} IS NULL AND {condition}',
+            [error]
+        )
+
+    def validate(self, cursor):
+        """Помечает строки, нарушающие ограничения целевой таблицы."""
+        for field in self.fields:
+            column = f'{self.staging}.{self.column(field)}'
+            if not field.null and not field.primary_key:
+                self.mark(
+                    cursor, f'пустое значение {field.column}',
+                    f'{column} IS NULL'
+                )
+            # Условие CHECK из определения колонки, например "year" >= 0
+            check = field.db_check(connection)
+            if check:
+                self.mark(
+                    cursor,
+                    f'значение {field.column} нарушает ограничение {check}',
+                    f'NOT ({check})'
+                )
+        for field in self.fields:
+            if not field.is_relation:
+                continue
+            target = field.target_field
+            parent = connection.ops.quote_name(target.model._meta.db_table)
+            column = f'{self.staging}.{self.column(field)}'
+            self.mark(
+                cursor,
+                f'нет связанной записи для {field.column}',
+                f'{column} IS NOT NULL AND NOT EXISTS ('
+                f'SELECT 1 FROM {parent} p '
+                f'WHERE {self.column(target, "p")} = {column})'
+            )
+        for index, fields in enumerate(self.unique_sets()):
+            names = ', '.join(field.column for field in fields)
+            cursor.execute(
+                f'CREATE INDEX {self.staging_index(index)} ON {self.staging} '
+                f'({", ".join(self.column(field) for field in fields)})'
+            )
+
+            def same(alias):
+                return ' AND '.join(
+                    f'{self.column(field, alias)} = '
+                    f'{self.staging}.{self.column(field)}'
+                    for field in fields
+                )
+            self.mark(
+                cursor,
+                f'запись с такими ({names}) уже есть в базе',
+                f'EXISTS (SELECT 1 FROM {self.table} t WHERE {same("t")})'
+            )
+            self.mark(
+                cursor,
+                f'повтор ({names}) внутри файла',
+                f'EXISTS (SELECT 1 FROM {self.staging} s WHERE {same("s")} '
+                f'AND s.{self.line_column} < '
+                f'{self.staging}.{self.line_column})'
+            )
+
+    def violations(self, cursor):
+        cursor.execute(
+            f'SELECT {self.line_column}, {self.error_column} '
+            f'FROM {self.staging} WHERE {self.error_column} IS NOT NULL '
+            f'ORDER BY {self.line_column}'
+        )
+        return cursor.fetchall()
+
+    def publish(self, cursor):
+        columns = ', '.join(self.column(field) for field in self.fields)
+        cursor.execute(
+            f'INSERT INTO {self.table} ({columns}) '
+            f'SELECT {columns} FROM {self.staging} '
+            f'WHERE {self.error_column} IS NULL ORDER BY {self.line_column}'
+        )
+        return cursor.rowcount
@@ -0,0 +1,177 @@
+"""Метрики запросов: число и время SQL-запросов, время сериализации и
+общее время ответа.
+
+Значения по каждому запросу отдаются в заголовке `Server-Timing`,
+суммы по представлениям и действиям - в формате Prometheus на
+`/api/v1/_metrics`. Счётчики живут в памяти процесса: при нескольких
+воркерах Prometheus опрашивает каждый из них отдельно.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.db import connections
+
+# Границы корзин гистограммы времени ответа, с
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+current_stats = ContextVar('current_stats', default=None)
+
+
+class RequestStats:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для `connection.execute_wrapper`."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def instrument(self):
+        """Контекст, в котором учитываются запросы ко всем базам."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def latency(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, latency):
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f'serializer;dur={self.serializer_time * 1000:.1f}, '
+            f'total;dur={latency * 1000:.1f}'
+        )
+
+
+class ViewMetrics:
+    """Накопленные значения для одного представления и действия."""
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.views = {}
+        self.lock = threading.Lock()
+
+    def record(self, view, action, stats, latency):
+        with self.lock:
+            metrics = self.views.get((view, action))
+            if metrics is None:
+                metrics = self.views[(view, action)] = ViewMetrics()
+            metrics.requests += 1
+            metrics.queries += stats.queries
+            metrics.db_time += stats.db_time
+            metrics.serializer_time += stats.serializer_time
+            metrics.latency_sum += latency
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self):
+        """Текст в формате Prometheus exposition 0.0.4."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+
+            def family(name, kind, help_text, value):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (view, action), metrics in views:
+                    lines.append(
+                        f'{name}{{view="{view}",action="{action}"}} '
+                        f'{value(metrics)}'
+                    )
+
+            family('api_requests_total', 'counter', 'Обработано запросов',
+                   lambda metrics: metrics.requests)
+            family('api_db_queries_total', 'counter',
+                   'Выполнено SQL-запросов',
+                   lambda metrics: metrics.queries)
+            family('api_db_seconds_total', 'counter',
+                   'Время выполнения SQL-запросов',
+                   lambda metrics: f'{metrics.db_time:.6f}')
+            family('api_serializer_seconds_total', 'counter',
+                   'Время сериализации ответов',
+                   lambda metrics: f'{metrics.serializer_time:.6f}')
+            name = 'api_request_duration_seconds'
+            lines.append(f'# HELP {name} Время ответа')
+            lines.append(f'# TYPE {name} histogram')
+            for (view, action), metrics in views:
+                labels = f'view="{view}",action="{action}"'
+                total = 0
+                bounds = [*map(str, LATENCY_BUCKETS), '+Inf']
+                for bound, count in zip(bounds, metrics.buckets):
+                    total += count
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+                    )
+                lines.append(
+                    f'{name}_sum{{{labels}}} {metrics.latency_sum:.6f}'
+                )
+                lines.append(f'{name}_count{{{labels}}} {metrics.requests}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def view_labels(request):
+    """Имя представления и действие DRF (list, retrieve, ...)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', request.method.lower()
+    func = match.func
+    view = getattr(func, 'cls', None)
+    view = view.__name__ if view is not None else match.view_name
+    actions = getattr(func, 'actions', None)
+    action = (
+        actions.get(request.method.lower()) if actions else None
+    ) or request.method.lower()
+    return view, action
+
+
+class TimedSerializerMixin:
+    """Учитывает время сериализации в метриках запроса.
+
+    Считается только внешний вызов `to_representation`: вложенные
+    сериализаторы не учитываются повторно, а элементы списка (many=True)
+    складываются.
+    """
+
+    def to_representation(self, instance):
+        stats = current_stats.get()
+        if stats is None:
+            return super().to_representation(instance)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_depth -= 1
+            if not stats.serializer_depth:
+                stats.serializer_time += time.perf_counter() - started
@@ -0,0 +1,48 @@
+from django.conf import settings
+
+from .metrics import RequestStats, current_stats, registry, view_labels
+from .queries import QueryInspector
+
+
+class InstrumentationMiddleware:
+    """Замеряет запрос: SQL, сериализацию и общее время.
+
+    Результат добавляется в заголовок `Server-Timing` и в счётчики
+    представления (api/metrics.py). Ставится первым в MIDDLEWARE, чтобы
+    учесть время остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            with stats.instrument():
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        latency = stats.latency
+        view, action = view_labels(request)
+        registry.record(view, action, stats, latency)
+        response['Server-Timing'] = stats.server_timing(latency)
+        return response
+
+
+class QueryInspectionMiddleware:
+    """Ищет повторяющиеся и медленные SQL-запросы (api/queries.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSPECTION:
+            return self.get_response(request)
+        inspector = QueryInspector()
+        with inspector.instrument():
+            response = self.get_response(request)
+        inspector.report(f'{request.method} {request.path}')
+        return response
@@ -1,9 +1,109 @@
-from rest_framework import filters, mixins, viewsets
+from hashlib import md5
 
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import filters, mixins, permissions, status, viewsets
+from rest_framework.response import Response
+
+from reviews.models import Review, Title
+from .cache import catalogue_key, catalogue_version, get_cache
 from .permissions import ReadOnlyOrAdminPermission
+from .routers import choose_replica, pin_to_primary, read_alias
+
+
+class ConditionalGetMixin:
+    """Поддержка условных GET-запросов (ETag и Last-Modified).
+
+    Представление возвращает из get_conditional_state() пару
+    (версия данных, время изменения или None). Если клиент прислал
+    совпадающий валидатор, ответ 304 отдаётся без выборки и сериализации.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        version, modified = self.get_conditional_state()
+        etag = '"%s"' % md5(':'.join((
+            str(version),
+            request.accepted_renderer.format,
+            request.build_absolute_uri(),
+        )).encode('utf-8')).hexdigest()
+        last_modified = int(modified.timestamp()) if modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CatalogueCacheMixin:
+    """Кэширует GET-ответы каталога по полному URL запроса.
+
+    Кэш сбрасывается сигналами при изменении категорий, жанров,
+    произведений и оценок (api/signals.py).
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def get_conditional_state(self):
+        return catalogue_version(), None
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = catalogue_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.CATALOGUE_CACHE_TIMEOUT)
+        return response
+
 
+class ReplicaReadMixin:
+    """Безопасные запросы читают с реплики базы (api/routers.py).
 
-class CreateListDestroyViewSet(mixins.CreateModelMixin,
+    Реплика выбирается после аутентификации: пользователь, недавно
+    изменявший данные, читает с основной базы. Запросы до этого момента,
+    включая загрузку пользователя, идут в основную базу.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS:
+            read_alias.set(choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (request.method not in permissions.SAFE_METHODS
+                and response.status_code < status.HTTP_400_BAD_REQUEST
+                and request.user.is_authenticated):
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CreateListDestroyViewSet(ReplicaReadMixin,
+                               ConditionalGetMixin,
+                               CatalogueCacheMixin,
+                               mixins.CreateModelMixin,
                                mixins.ListModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
@@ -11,3 +111,33 @@ class CreateListDestroyViewSet(mixins.CreateModelMixin,
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+
+
+class TitleResolverMixin:
+    """Загружает произведение из URL не более одного раза за запрос.
+
+    Используется представлением, скрытыми полями и валидаторами.
+    """
+
+    def get_title(self):
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, id=self.kwargs.get('title_id')
+            )
+        return self._title
+
+
+class ReviewResolverMixin:
+    """Загружает отзыв из URL не более одного раза за запрос.
+
+    Принадлежность отзыва произведению из URL проверяется тем же запросом.
+    """
+
+    def get_review(self):
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.select_related('title'),
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
@@ -0,0 +1,133 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def key_value(row, name):
+    """Поле ключа из модели или из строки values()."""
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+class KeysetOptInPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным курсорным режимом.
+
+    По умолчанию работает как PageNumberPagination. С параметром
+    `?pagination=cursor` (или при наличии `cursor`) выборка идёт по ключу
+    `(pub_date, id)`: без OFFSET и COUNT(*), поэтому стоимость страницы
+    не зависит от её глубины.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_query_param = 'cursor'
+    keyset_fields = ('pub_date', 'id')
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        position = self.decode_cursor(request)
+        reverse = position is not None and position[2]
+
+        field, tiebreaker = self.keyset_fields
+        if reverse:
+            queryset = queryset.order_by(f'-{field}', f'-{tiebreaker}')
+        else:
+            queryset = queryset.order_by(field, tiebreaker)
+        if position is not None:
+            lookup = 'lt' if reverse else 'gt'
+            value, pk = position[0], position[1]
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value})
+                | Q(**{field: value, f'{tiebreaker}__{lookup}': pk})
+            )
+
+        results = list(queryset[:page_size + 1])
+        has_following = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.base_url, self.cursor_query_param
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(
+                b64decode(encoded.encode('ascii')).decode('ascii')
+            )
+            value = parse_datetime(tokens['p'][0])
+            pk = int(tokens['i'][0])
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, reverse
+
+    def encode_cursor(self, instance, reverse):
+        field, tiebreaker = self.keyset_fields
+        tokens = {
+            'p': key_value(instance, field).isoformat(),
+            'i': key_value(instance, tiebreaker),
+        }
+        if reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(
+            parse.urlencode(tokens).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
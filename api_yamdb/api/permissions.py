@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .authentication import METRICS_AUTH
+
 
 class ReviewCommentPermission(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -26,3 +28,13 @@ class ReadOnlyOrAdminPermission(permissions.BasePermission):
         if request.user.is_anonymous:
             return False
         return request.user.admin_permission
+
+
+class MetricsPermission(permissions.BasePermission):
+    """Администратор или сборщик метрик с токеном METRICS_TOKEN."""
+
+    def has_permission(self, request, view):
+        if request.auth == METRICS_AUTH:
+            return True
+        return (request.user.is_authenticated
+                and request.user.admin_permission)
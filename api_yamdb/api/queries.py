@@ -0,0 +1,134 @@
+"""Поиск повторяющихся (N+1) и медленных SQL-запросов.
+
+`QueryInspector` подключается через `connection.execute_wrapper` на время
+запроса (api/middleware.py) и группирует SQL по шаблону: литералы и
+списки IN заменяются на `?`. Шаблон, выполненный QUERY_REPEAT_LIMIT раз
+и больше, и запрос дольше SLOW_QUERY_THRESHOLD секунд считаются
+проблемой. Режим QUERY_INSPECTION задаёт реакцию: 'log' - предупреждение
+в логгер `api.queries` (для стенда), 'raise' - исключение
+`QueryProblemsError` (для тестов), None - проверка отключена.
+"""
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\bIN \((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+# Служебные запросы транзакций повторяются законно
+IGNORED = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+MAX_SQL_LENGTH = 300
+# Модули обёрток execute_wrapper: их кадры пропускаются при поиске места
+WRAPPER_FILES = {__file__, metrics.__file__}
+
+
+class QueryProblemsError(Exception):
+    """Запрос к API выполнил повторяющиеся или медленные SQL-запросы."""
+
+
+def sql_pattern(sql):
+    """Шаблон запроса: одинаков для запросов, различающихся значениями."""
+    sql = IN_LISTS.sub('IN (...)', sql)
+    sql = LITERALS.sub('?', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def caller():
+    """Ближайшее к запросу место в коде проекта, 'файл:строка'."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if (frame.filename.startswith(base_dir)
+                and frame.filename not in WRAPPER_FILES):
+            path = Path(frame.filename).relative_to(base_dir)
+            return f'{path}:{frame.lineno}'
+    return None
+
+
+class QueryPattern:
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.duration = 0.0
+        self.caller = None
+
+
+class QueryInspector:
+    """Счётчики SQL-шаблонов одного запроса к API."""
+
+    def __init__(self, repeat_limit=None, slow_threshold=None):
+        self.repeat_limit = repeat_limit or settings.QUERY_REPEAT_LIMIT
+        self.slow_threshold = slow_threshold or settings.SLOW_QUERY_THRESHOLD
+        self.patterns = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(
+                context['connection'].alias, sql,
+                time.perf_counter() - started
+            )
+
+    def record(self, alias, sql, duration):
+        if sql.lstrip().upper().startswith(IGNORED):
+            return
+        key = (alias, sql_pattern(sql))
+        pattern = self.patterns.get(key)
+        if pattern is None:
+            pattern = self.patterns[key] = QueryPattern(key[1])
+        pattern.count += 1
+        pattern.duration += duration
+        # Стек разбирается один раз, когда шаблон становится проблемой
+        if pattern.count == self.repeat_limit:
+            pattern.caller = caller()
+        if duration >= self.slow_threshold:
+            self.slow.append((duration, sql, caller()))
+
+    def instrument(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def problems(self):
+        """Описания найденных проблем, пустой список - если их нет."""
+        problems = [
+            f'{pattern.count} одинаковых запросов '
+            f'({pattern.duration * 1000:.1f} мс)'
+            f'{f" из {pattern.caller}" if pattern.caller else ""}: '
+            f'{pattern.sql[:MAX_SQL_LENGTH]}'
+            for pattern in self.patterns.values()
+            if pattern.count >= self.repeat_limit
+        ]
+        problems.extend(
+            f'медленный запрос ({duration * 1000:.1f} мс)'
+            f'{f" из {location}" if location else ""}: '
+            f'{sql[:MAX_SQL_LENGTH]}'
+            for duration, sql, location in self.slow
+        )
+        return problems
+
+    def report(self, label):
+        """Реагирует на проблемы согласно QUERY_INSPECTION."""
+        problems = self.problems()
+        if not problems:
+            return
+        if settings.QUERY_INSPECTION == 'raise':
+            raise QueryProblemsError(
+                '\n'.join([f'{label}:', *problems])
+            )
+        for problem in problems:
+            logger.warning('%s: %s', label, problem)
@@ -0,0 +1,60 @@
+"""Чтение с реплик базы данных.
+
+`ReplicaRouter` отправляет чтение на реплику, выбранную для текущего
+запроса, а запись - на основную базу. Реплику для безопасных запросов
+выбирает представление с `ReplicaReadMixin` (api/mixins.py). После
+успешной записи пользователь REPLICA_PIN_SECONDS читает с основной
+базы, чтобы сразу видеть свои изменения, пока реплика их догоняет.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Псевдоним базы для чтения в текущем запросе; None - основная база
+read_alias = ContextVar('read_alias', default=None)
+
+
+def get_cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_key(user):
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Пользователь изменил данные: на время читать с основной базы."""
+    get_cache().set(pin_key(user), True, settings.REPLICA_PIN_SECONDS)
+
+
+def choose_replica(user):
+    """Реплика для чтения или None, если читать с основной базы."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and get_cache().get(pin_key(user)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """Чтение с реплики текущего запроса, запись в основную базу.
+
+    Внутри транзакции чтение остаётся в основной базе, чтобы видеть
+    собственные незафиксированные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
@@ -1,16 +1,21 @@
 import re
+from functools import partial
 
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.search import KINDS
+from .fields import SlugListRelatedField
 from .hidden import CurrentReviewDefault, CurrentTitleDefault
+from .metrics import TimedSerializerMixin
+from .sparse import SparseFieldsMixin
 
 User = get_user_model()
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Category
@@ -18,7 +23,7 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Genre
@@ -26,18 +31,32 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class TitleGetSerializer(serializers.ModelSerializer):
+class TitleGetSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                         serializers.ModelSerializer):
     genre = GenreSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True)
-    rating = serializers.IntegerField(read_only=True)
+
+    expandable = {
+        'genre': (
+            partial(serializers.SlugRelatedField, slug_field='slug',
+                    many=True, read_only=True),
+            partial(GenreSerializer, many=True, read_only=True),
+        ),
+        'category': (
+            partial(serializers.SlugRelatedField, slug_field='slug',
+                    read_only=True),
+            partial(CategorySerializer, read_only=True),
+        ),
+    }
+    default_expand = ('genre', 'category')
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('reviews_count', 'score_sum', 'reviews_modified')
 
 
-class TitleWriteSerializer(serializers.ModelSerializer):
-    genre = serializers.SlugRelatedField(
+class TitleWriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    genre = SlugListRelatedField(
         many=True,
         slug_field='slug',
         queryset=Genre.objects.all()
@@ -49,25 +68,52 @@ class TitleWriteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = (
+            'rating', 'reviews_count', 'score_sum', 'reviews_modified'
+        )
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleBulkItemSerializer(TitleWriteSerializer):
+    """Произведение в массовой загрузке.
+
+    Slug проверяются только по формату: существование категорий и жанров
+    проверяется сразу для всей пачки (api/bulk.py).
+    """
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """Публичные данные автора для `?expand=author`"""
+
+    class Meta:
+        model = User
+        fields = ('username', 'first_name', 'last_name', 'bio')
+
+
+class ReviewSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                       serializers.ModelSerializer):
     title = serializers.HiddenField(default=CurrentTitleDefault())
     author = serializers.SlugRelatedField(
         slug_field="username", read_only=True,
         default=serializers.CurrentUserDefault()
     )
 
+    expandable = {
+        'author': (
+            partial(serializers.SlugRelatedField, slug_field='username',
+                    read_only=True),
+            partial(AuthorSerializer, read_only=True),
+        ),
+    }
+
     def validate(self, data):
         """Проверяем, оставлял ли пользователь отзыв к произведению ранее."""
-        view = self.context['view']
-        request = self.context['request']
-        title_id = view.kwargs.get('title_id')
-        author = request.user
-        if (Review.objects.filter(author=author,
-                                  title__id=title_id).exists()
-                and request.method != 'PATCH'):
+        if self.instance is not None:
+            return data
+        title = self.context['view'].get_title()
+        author = self.context['request'].user
+        if Review.objects.filter(author=author, title=title).exists():
             raise serializers.ValidationError(
                 'Вы уже оставляли отзыв к этому произведению.'
             )
@@ -78,7 +124,8 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, TimedSerializerMixin,
+                        serializers.ModelSerializer):
     review = serializers.HiddenField(
         default=CurrentReviewDefault())
     author = serializers.SlugRelatedField(
@@ -87,11 +134,22 @@ class CommentSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault()
     )
 
+    expandable = ReviewSerializer.expandable
+
     class Meta:
         fields = '__all__'
         model = Comment
 
 
+class SearchQuerySerializer(serializers.Serializer):
+    """Параметры полнотекстового поиска"""
+    search = serializers.CharField(max_length=256)
+    type = serializers.MultipleChoiceField(
+        choices=tuple(KINDS), required=False
+    )
+    page = serializers.IntegerField(min_value=1, default=1)
+
+
 class BaseCustomUserSerializer(serializers.Serializer):
     """Базовый сериализатор для работы с пользователями"""
     username = serializers.CharField(max_length=150)
@@ -121,7 +179,8 @@ class AuthTokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField()
 
 
-class UsersSerializer(BaseCustomUserSerializer, serializers.ModelSerializer):
+class UsersSerializer(TimedSerializerMixin, BaseCustomUserSerializer,
+                      serializers.ModelSerializer):
     """Сериализатор для работы с пользователями"""
     email = serializers.EmailField(
         max_length=254,
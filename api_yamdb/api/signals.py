@@ -0,0 +1,42 @@
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Category, Genre, Review, Title
+from .cache import invalidate_catalogue
+from .db import check_connections, configure_sqlite
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(m2m_changed, sender=Title.genre.through)
+@receiver(post_delete, sender=Review)
+def catalogue_changed(sender, **kwargs):
+    # После фиксации: иначе параллельный запрос успеет положить в кэш
+    # данные до изменения уже под новой версией
+    transaction.on_commit(invalidate_catalogue)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Сбрасываем кэш, только если изменение отзыва влияет на рейтинг."""
+    previous = getattr(instance, '_previous', None)
+    if created or previous != (instance.title_id, instance.score):
+        transaction.on_commit(invalidate_catalogue)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        configure_sqlite(connection)
+
+
+@receiver(request_started)
+def request_started_check(sender, **kwargs):
+    check_connections()
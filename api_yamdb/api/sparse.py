@@ -0,0 +1,171 @@
+"""Выбор полей ответа параметрами `?fields=` и `?expand=`.
+
+`?fields=id,name,rating` оставляет в ответе только перечисленные поля,
+`?expand=author` разворачивает связь во вложенный объект, а пустой
+`?expand=` сворачивает развёрнутые по умолчанию связи до slug. Запрос к
+базе сужается под выбранные поля: only() для колонок, select_related и
+prefetch_related - только для попавших в ответ связей.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(request, param):
+    """Список имён из параметра или None, если параметра нет."""
+    if param not in request.query_params:
+        return None
+    return [
+        name.strip()
+        for name in request.query_params[param].split(',')
+        if name.strip()
+    ]
+
+
+def sparse_selection(request, serializer_class):
+    """Пара (поля или None, развёрнутые связи) из параметров запроса.
+
+    Возвращает None, если параметры не переданы.
+    """
+    fields = parse_names(request, FIELDS_PARAM)
+    expand = parse_names(request, EXPAND_PARAM)
+    if fields is None and expand is None:
+        return None
+    available = {
+        name for name, field in serializer_class().fields.items()
+        if not field.write_only
+    }
+    errors = {}
+    if fields is not None and set(fields) - available:
+        errors[FIELDS_PARAM] = 'Неизвестные поля: ' + ', '.join(
+            sorted(set(fields) - available)
+        )
+    expandable = getattr(serializer_class, 'expandable', {})
+    if expand is not None and set(expand) - set(expandable):
+        errors[EXPAND_PARAM] = 'Нельзя развернуть: ' + ', '.join(
+            sorted(set(expand) - set(expandable))
+        )
+    if errors:
+        raise serializers.ValidationError(errors)
+    if expand is None:
+        expand = serializer_class.default_expand
+    return fields, frozenset(expand)
+
+
+class SparseFieldsMixin:
+    """Сериализатор с полями по выбору клиента.
+
+    `expandable` - {связь: (свёрнутое поле, развёрнутое поле)}, фабрики
+    полей; `default_expand` - связи, объявленные в классе развёрнутыми.
+    Выбор передаётся представлением в context['sparse'].
+    """
+    expandable = {}
+    default_expand = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selection = self.context.get('sparse')
+        if selection is None:
+            return
+        fields, expand = selection
+        for name, (collapsed, expanded) in self.expandable.items():
+            if (name in expand) != (name in self.default_expand):
+                self.fields[name] = (
+                    expanded if name in expand else collapsed
+                )()
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def related_columns(field):
+    """Колонки связанной модели, которые читает поле, или None."""
+    if isinstance(field, serializers.ManyRelatedField):
+        field = field.child_relation
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    if isinstance(field, serializers.SlugRelatedField):
+        return [field.slug_field]
+    if isinstance(field, serializers.ModelSerializer):
+        model = field.Meta.model
+        columns = []
+        for nested in field.fields.values():
+            try:
+                model_field = model._meta.get_field(nested.source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.is_relation:
+                return None
+            columns.append(nested.source)
+        return columns
+    return None
+
+
+def narrow_queryset(queryset, serializer, required=()):
+    """Выборка только колонок и связей, которые нужны сериализатору.
+
+    Если поле нельзя сопоставить колонкам модели, выборка не меняется.
+    """
+    meta = queryset.model._meta
+    only = {meta.pk.name, *required}
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        try:
+            model_field = meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return queryset
+        if not model_field.is_relation:
+            only.add(model_field.name)
+            continue
+        columns = related_columns(field)
+        if columns is None:
+            return queryset
+        if model_field.many_to_many:
+            prefetch.append(Prefetch(
+                model_field.name,
+                queryset=model_field.related_model.objects.only(*columns)
+            ))
+        else:
+            select.append(model_field.name)
+            only.update(f'{model_field.name}__{column}' for column in columns)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    return queryset.select_related(*select).prefetch_related(
+        *prefetch
+    ).only(*only)
+
+
+class SparseFieldsViewMixin:
+    """Передаёт выбор полей сериализатору и сужает под него выборку
+    (sparse_queryset вызывается в get_queryset представления).
+
+    Действует для list и retrieve; поля ключа курсорной пагинации
+    читаются всегда.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_selection(self):
+        if not hasattr(self, '_sparse_selection'):
+            self._sparse_selection = None
+            if self.action in self.sparse_actions:
+                self._sparse_selection = sparse_selection(
+                    self.request, self.get_serializer_class()
+                )
+        return self._sparse_selection
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse'] = self.get_sparse_selection()
+        return context
+
+    def sparse_queryset(self, queryset):
+        if self.get_sparse_selection() is None:
+            return queryset
+        return narrow_queryset(
+            queryset, self.get_serializer(),
+            getattr(self.pagination_class, 'keyset_fields', ())
+        )
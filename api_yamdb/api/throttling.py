@@ -0,0 +1,207 @@
+"""Ограничение частоты запросов корзиной токенов.
+
+Корзина области (`auth`, `writes`, `reads`) вмещает N токенов и
+пополняется со скоростью N за период из DEFAULT_THROTTLE_RATES
+('10/min'); каждый запрос забирает токен. Состояние корзины - два числа,
+поэтому проверка стоит O(1) при любой частоте запросов, в отличие от
+списка времён запросов в SimpleRateThrottle.
+
+Корзины хранятся в файле THROTTLE_STORE_PATH, отображённом в память:
+все процессы хоста работают с одной таблицей под блокировкой файла.
+Таблица фиксированного размера, ключ ищется среди WAYS ячеек своего
+набора, а при нехватке места вытесняется дольше всех не обновлявшаяся
+корзина - она начнётся заново полной. Без THROTTLE_STORE_PATH (или без
+fcntl, например на Windows) корзины хранятся в кэше
+THROTTLE_CACHE_ALIAS.
+"""
+import mmap
+import os
+import struct
+import threading
+from functools import lru_cache
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import permissions
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Отпечаток ключа, число токенов, время обновления
+RECORD = struct.Struct('<Qdd')
+WAYS = 4
+
+
+def refill(tokens, updated, capacity, rate, now):
+    """Забирает токен из корзины.
+
+    Возвращает новое число токенов и 0, если токен был, иначе секунды
+    до появления следующего токена.
+    """
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class SharedBucketStore:
+    """Таблица корзин в файле, общая для процессов хоста."""
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.sets = max(1, slots // WAYS)
+        self.size = self.sets * WAYS * RECORD.size
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def open(self):
+        # Блокировка flock принадлежит открытому файлу, который после
+        # fork общий у родителя и потомка, поэтому файл открывается
+        # заново в каждом процессе
+        if self.pid == os.getpid():
+            return
+        descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(descriptor).st_size < self.size:
+            os.ftruncate(descriptor, self.size)
+        self.descriptor = descriptor
+        self.map = mmap.mmap(descriptor, self.size)
+        self.pid = os.getpid()
+
+    def consume(self, key, capacity, rate, now):
+        fingerprint = int.from_bytes(
+            blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little'
+        )
+        first = fingerprint % self.sets * WAYS
+        with self.lock:
+            self.open()
+            fcntl.flock(self.descriptor, fcntl.LOCK_EX)
+            try:
+                slot, oldest = first, None
+                for candidate in range(first, first + WAYS):
+                    stored, tokens, updated = RECORD.unpack_from(
+                        self.map, candidate * RECORD.size
+                    )
+                    if stored == fingerprint:
+                        slot = candidate
+                        break
+                    if oldest is None or updated < oldest:
+                        slot, oldest = candidate, updated
+                else:
+                    tokens, updated = capacity, now
+                tokens, wait = refill(tokens, updated, capacity, rate, now)
+                RECORD.pack_into(
+                    self.map, slot * RECORD.size, fingerprint, tokens, now
+                )
+            finally:
+                fcntl.flock(self.descriptor, fcntl.LOCK_UN)
+        return wait
+
+
+class CacheBucketStore:
+    """Корзины в кэше Django.
+
+    Чтение и запись корзины не атомарны: при одновременных запросах
+    одного клиента из разных процессов лимит может быть превышен.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def consume(self, key, capacity, rate, now):
+        cache = caches[self.alias]
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens, wait = refill(tokens, updated, capacity, rate, now)
+        # Полная корзина не отличается от отсутствующей
+        cache.set(key, (tokens, now), (capacity - tokens) / rate + 1)
+        return wait
+
+
+@lru_cache(maxsize=None)
+def shared_store(path, slots):
+    return SharedBucketStore(path, slots)
+
+
+def get_store():
+    if settings.THROTTLE_STORE_PATH and fcntl is not None:
+        return shared_store(
+            str(settings.THROTTLE_STORE_PATH), settings.THROTTLE_STORE_SLOTS
+        )
+    return CacheBucketStore(settings.THROTTLE_CACHE_ALIAS)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle с корзиной токенов вместо истории запросов.
+
+    Частота читается из настроек при каждом запросе; None отключает
+    ограничение области.
+    """
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'Не задана частота для области {self.scope}'
+            )
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.wait_time = get_store().consume(
+            self.key, self.num_requests, self.num_requests / self.duration,
+            self.timer()
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthThrottle(TokenBucketThrottle):
+    """Регистрация и получение токена: по IP-адресу клиента.
+
+    Адрес берётся из X-Forwarded-For с учётом NUM_PROXIES в REST_FRAMEWORK
+    (переменная окружения NUM_PROXIES), без прокси - REMOTE_ADDR.
+    """
+    scope = 'auth'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class UserThrottle(TokenBucketThrottle):
+    """По пользователю, для анонимных запросов - по IP-адресу.
+
+    `safe_methods` - считать только безопасные или только остальные
+    запросы.
+    """
+    safe_methods = True
+
+    def get_cache_key(self, request, view):
+        if (request.method in permissions.SAFE_METHODS) != self.safe_methods:
+            return None
+        if request.user.is_authenticated:
+            ident = f'user{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class ReadThrottle(UserThrottle):
+    scope = 'reads'
+
+
+class WriteThrottle(UserThrottle):
+    scope = 'writes'
+    safe_methods = False
@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (ReviewViewSet, CategoryViewSet, CommentViewSet,
-                    GenreViewSet, TitleViewSet, auth_signup, auth_token,
-                    UsersViewSet)
+                    ExportView, GenreViewSet, MetricsView, TitleViewSet,
+                    auth_signup, auth_token, search, UsersViewSet)
 
 app_name = 'api'
 
@@ -22,5 +22,8 @@ router.register(r'users', UsersViewSet, basename='users')
 urlpatterns = [
     path('v1/auth/signup/', auth_signup, name='signup'),
     path('v1/auth/token/', auth_token, name='token'),
+    path('v1/search/', search, name='search'),
+    path('v1/export/<slug:dataset>/', ExportView.as_view(), name='export'),
+    path('v1/_metrics', MetricsView.as_view(), name='metrics'),
     path('v1/', include(router.urls)),
 ]
@@ -1,28 +1,48 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.db import IntegrityError
-from django.db.models import Avg
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from api.filters import TitleFilter
+from api.authentication import (ClaimsJWTAuthentication,
+                                MetricsTokenAuthentication, access_token_for)
+from api.bulk import BULK_MAX_ITEMS, create_titles
+from api.compiled import CompiledListMixin
+from api.export import CONTENT_TYPES, DATASETS, export_lines
+from api.filters import FullTextSearchFilter, TitleFilter
 from api_yamdb.settings import ADMIN_EMAIL
-from reviews.models import Category, Genre, Review, Title
-from .mixins import CreateListDestroyViewSet
-from .permissions import (AllActionsOnlyAdminPermission,
+from reviews.models import Category, Genre, Title
+from reviews.search import get_backend
+from users.mail import enqueue_mail
+from .metrics import registry
+from .mixins import (CatalogueCacheMixin, ConditionalGetMixin,
+                     CreateListDestroyViewSet, ReplicaReadMixin,
+                     ReviewResolverMixin, TitleResolverMixin)
+from .pagination import KeysetOptInPagination
+from .permissions import (AllActionsOnlyAdminPermission, MetricsPermission,
                           ReadOnlyOrAdminPermission,
                           ReviewCommentPermission)
+from .renderers import CSVRenderer, FAST_RENDERER_CLASSES, NDJSONRenderer
 from .serializers import (ReviewSerializer, CategorySerializer,
                           AuthSignupSerializer, AuthTokenSerializer,
                           CommentSerializer, GenreSerializer,
                           TitleGetSerializer, TitleWriteSerializer,
-                          MeSerializer, UsersSerializer)
+                          MeSerializer, SearchQuerySerializer,
+                          UsersSerializer)
+from .sparse import SparseFieldsViewMixin
+from .throttling import AuthThrottle
 
 User = get_user_model()
 
@@ -37,46 +57,104 @@ class GenreViewSet(CreateListDestroyViewSet):
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')).all()
+class TitleViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                   CatalogueCacheMixin, SparseFieldsViewMixin,
+                   CompiledListMixin, viewsets.ModelViewSet):
+    renderer_classes = FAST_RENDERER_CLASSES
+    queryset = Title.objects.all()
     permission_classes = (ReadOnlyOrAdminPermission,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, FullTextSearchFilter)
     filterset_class = TitleFilter
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_serializer_class() is TitleGetSerializer:
+            queryset = queryset.with_related()
+        return self.sparse_queryset(queryset)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            partial(self.cached_response, super().retrieve),
+            request, *args, **kwargs
+        )
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleGetSerializer
         return TitleWriteSerializer
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Создание списка произведений с ошибками по каждому элементу"""
+        if not isinstance(request.data, list):
+            return Response(
+                {'detail': 'Ожидается список произведений'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > BULK_MAX_ITEMS:
+            return Response(
+                {'detail': f'Не больше {BULK_MAX_ITEMS} произведений '
+                           'за один запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        created, errors = create_titles(request.data)
+        return Response(
+            {'created': created, 'errors': errors},
+            status=(status.HTTP_201_CREATED if created
+                    else status.HTTP_400_BAD_REQUEST)
+        )
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    TitleResolverMixin, SparseFieldsViewMixin,
+                    CompiledListMixin, viewsets.ModelViewSet):
+    renderer_classes = FAST_RENDERER_CLASSES
     serializer_class = ReviewSerializer
     permission_classes = (ReviewCommentPermission,)
-    pagination_class = PageNumberPagination
+    pagination_class = KeysetOptInPagination
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        new_queryset = title.reviews.all()
-        return new_queryset
+        return self.sparse_queryset(
+            self.get_title().reviews.select_related('author')
+        )
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_conditional_state(self):
+        title = self.get_title()
+        return title.reviews_modified, title.reviews_modified
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                     ReviewResolverMixin, SparseFieldsViewMixin,
+                     CompiledListMixin, viewsets.ModelViewSet):
+    renderer_classes = FAST_RENDERER_CLASSES
     serializer_class = CommentSerializer
     permission_classes = (ReviewCommentPermission,)
-    pagination_class = PageNumberPagination
+    pagination_class = KeysetOptInPagination
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        new_queryset = review.comments.all()
-        return new_queryset
+        return self.sparse_queryset(
+            self.get_review().comments.select_related('author')
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_conditional_state(self):
+        title = self.get_review().title
+        return title.reviews_modified, title.reviews_modified
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -105,6 +183,7 @@ class UsersViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AuthThrottle])
 def auth_signup(request):
     """Регистрация пользователей"""
     serializer = AuthSignupSerializer(data=request.data)
@@ -120,18 +199,18 @@ def auth_signup(request):
         return Response('Пользователь с таким username уже существует',
                         status.HTTP_400_BAD_REQUEST)
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    enqueue_mail(
         f'{username}, your Confirmation code',
         confirmation_code,
         ADMIN_EMAIL,
         [email],
-        fail_silently=False,
     )
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AuthThrottle])
 def auth_token(request):
     """Получение токена"""
     serializer = AuthTokenSerializer(data=request.data)
@@ -140,8 +219,79 @@ def auth_token(request):
     user = get_object_or_404(User, username=username)
     confirmation_code = serializer.validated_data.get('confirmation_code')
     if default_token_generator.check_token(user, confirmation_code):
-        refresh = RefreshToken.for_user(user)
-        return Response({'token': str(refresh.access_token)},
+        return Response({'token': str(access_token_for(user))},
                         status=status.HTTP_200_OK)
     return Response({'confirmation_code': 'Неверный код подтверждения'},
                     status=status.HTTP_400_BAD_REQUEST)
+
+
+class ExportView(APIView):
+    """Потоковая выгрузка набора данных. Только для администратора"""
+    permission_classes = (AllActionsOnlyAdminPermission,)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise NotFound(f'Нет набора данных {dataset}')
+        output_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            export_lines(dataset, output_format),
+            content_type=CONTENT_TYPES[output_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{output_format}"'
+        )
+        return response
+
+
+class MetricsView(APIView):
+    """Метрики в формате Prometheus.
+
+    Только для администратора или с токеном METRICS_TOKEN; адрес клиента
+    не проверяется - за обратным прокси он у всех запросов локальный.
+    """
+    authentication_classes = (
+        MetricsTokenAuthentication, ClaimsJWTAuthentication
+    )
+    permission_classes = (MetricsPermission,)
+    throttle_classes = ()
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def search(request):
+    """Полнотекстовый поиск по произведениям, отзывам и комментариям"""
+    serializer = SearchQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    page = serializer.validated_data['page']
+    page_size = api_settings.PAGE_SIZE
+    hits = get_backend().search(
+        serializer.validated_data['search'],
+        kinds=serializer.validated_data.get('type'),
+        limit=page_size + 1,
+        offset=(page - 1) * page_size
+    )
+    url = request.build_absolute_uri()
+    return Response({
+        'next': (replace_query_param(url, 'page', page + 1)
+                 if len(hits) > page_size else None),
+        'previous': (replace_query_param(url, 'page', page - 1)
+                     if page > 1 else None),
+        'results': [
+            {
+                'type': hit['kind'],
+                'id': hit['object_id'],
+                'title_id': hit['title_id'],
+                'review_id': hit['review_id'],
+                'score': hit['score'],
+                'snippet': hit['snippet'],
+            }
+            for hit in hits[:page_size]
+        ],
+    }, status=status.HTTP_200_OK)
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',
+    'api.middleware.QueryInspectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,6 +41,19 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'api_yamdb.urls'
 
+# Метрики запросов (api/metrics.py): заголовок Server-Timing и
+# /api/v1/_metrics, доступный администратору и сборщику метрик с
+# заголовком `Authorization: Bearer <METRICS_TOKEN>`. Без METRICS_TOKEN -
+# только администратору.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Поиск N+1 и медленных SQL-запросов (api/queries.py): None - отключён,
+# 'log' - предупреждения в логгер api.queries, 'raise' - исключение.
+QUERY_INSPECTION = None
+QUERY_REPEAT_LIMIT = 10
+SLOW_QUERY_THRESHOLD = 0.5
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
@@ -59,13 +74,92 @@ TEMPLATES = [
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 
-DATABASES = {
+# База выбирается переменной окружения DB_ENGINE: sqlite (по умолчанию)
+# или postgresql. Соединения постоянные (DB_CONN_MAX_AGE секунд) и
+# проверяются перед каждым запросом (api/db.py). Django 3.2 не умеет
+# пула соединений, поэтому для PostgreSQL пул держит PgBouncer:
+# с DB_POOLER=pgbouncer (режим transaction) серверные курсоры отключаются.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 600))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'api_yamdb'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_POOLER') == 'pgbouncer'
+            ),
+        }
+    }
+else:
+    # Транзакции берут блокировку на запись сразу (api/backends/sqlite3):
+    # иначе транзакция, которая читает и затем пишет, при конкурентной
+    # записи падает с "database is locked", не дожидаясь busy_timeout.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'api.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }
+    }
+
+# Реплики для чтения: DB_REPLICAS - хосты PostgreSQL или файлы SQLite
+# через запятую. GET-запросы к каталогу, отзывам и комментариям читают
+# со случайной реплики (api/routers.py), запись идёт в основную базу.
+# После записи пользователь REPLICA_PIN_SECONDS читает с основной базы;
+# окно должно быть больше отставания реплик. Отметки хранятся в кэше
+# REPLICA_PIN_CACHE_ALIAS: при нескольких воркерах нужен общий бэкенд.
+REPLICA_SETTING = 'HOST' if DB_ENGINE == 'postgresql' else 'NAME'
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        REPLICA_SETTING: replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+# PRAGMA для каждого нового соединения с SQLite (api/db.py): WAL не
+# блокирует чтение записью, synchronous=NORMAL в режиме WAL безопасен
+# для целостности и не ждёт fsync на каждой транзакции.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 2 ** 20,
+    'busy_timeout': 10_000,
+}
+
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Кэш ответов каталога (категории, жанры, произведения). LocMemCache живёт
+# внутри процесса: при нескольких воркерах укажите общий бэкенд (Redis,
+# Memcached, FileBasedCache), иначе сброс увидит только один процесс.
+CATALOGUE_CACHE_ALIAS = 'default'
+CATALOGUE_CACHE_TIMEOUT = 60 * 5
+
+# Файл триграммного индекса названий для нечёткого поиска. Создаётся
+# командой build-trigram-index; если файла нет, индекс строится по таблице
+# при первом запросе. Воркеры перечитывают файл после его пересборки, а до
+# неё видят только изменения названий, сделанные в своём процессе.
+TRIGRAM_INDEX_PATH = BASE_DIR / 'trigram_index.bin'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,25 +195,72 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь писем (users/mail.py): письма отправляет команда send-queued-mail.
+# MAIL_QUEUE_EAGER = True отправляет их сразу при постановке в очередь.
+MAIL_QUEUE_EAGER = False
+MAIL_QUEUE_BATCH_SIZE = 100
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_DELAY = 60
+MAIL_QUEUE_LEASE = 60 * 5
+
 AUTH_USER_MODEL = 'users.User'
 
 
+# Число обратных прокси перед приложением. Ограничение частоты по IP
+# (область auth и анонимные запросы) берёт адрес клиента, добавленный
+# последним из NUM_PROXIES прокси в X-Forwarded-For. По умолчанию 0 -
+# только REMOTE_ADDR: без прокси клиент не подменит адрес заголовком, но
+# за прокси у всех клиентов одна корзина, поэтому там NUM_PROXIES нужно
+# задать обязательно.
+NUM_PROXIES = int(os.getenv('NUM_PROXIES', 0))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAdminUser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ReadThrottle',
+        'api.throttling.WriteThrottle',
+    ],
+    'NUM_PROXIES': NUM_PROXIES,
+    # Ёмкость корзины и скорость её пополнения (api/throttling.py);
+    # auth - регистрация и получение токена, по IP-адресу
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': '10/min',
+        'writes': '60/min',
+        'reads': '600/min',
+    },
 }
 
+# Корзины ограничения частоты в файле, общем для процессов хоста.
+# None - хранить в кэше THROTTLE_CACHE_ALIAS (для нескольких хостов -
+# общий бэкенд, например Redis).
+THROTTLE_STORE_PATH = BASE_DIR / 'throttle.bin'
+THROTTLE_STORE_SLOTS = 2 ** 16
+THROTTLE_CACHE_ALIAS = 'default'
+
+
+# Списки произведений, отзывов и комментариев строятся из values()
+# (api/compiled.py) и кодируются функцией JSON_DUMPS (api/renderers.py):
+# None - orjson, если он установлен, иначе json из stdlib.
+COMPILED_SERIALIZERS = True
+JSON_DUMPS = None
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=5),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Кэш версий токенов (users/tokens.py). Как и для каталога, при нескольких
+# процессах нужен общий бэкенд: с LocMemCache отзыв токена дойдёт до
+# остальных процессов только по истечении TOKEN_VERSION_CACHE_TIMEOUT.
+TOKEN_VERSION_CACHE_ALIAS = 'default'
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
 # Email администратора ресурса
 ADMIN_EMAIL = 'ymdb@ymdb.com'
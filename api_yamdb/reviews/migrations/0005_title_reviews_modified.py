@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='reviews_modified',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последнее изменение отзывов и комментариев'),
+        ),
+    ]
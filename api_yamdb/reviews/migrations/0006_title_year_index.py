@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 04:33
+
+from django.db import migrations, models
+import reviews.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_reviews_modified'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, validators=[reviews.validators.validate_year], verbose_name='Год создания'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+SQLITE_SQL = (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, title_id UNINDEXED, "
+    "review_id UNINDEXED, name, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+)
+POSTGRES_SQL = (
+    "CREATE TABLE search_index ("
+    "doc_id bigint PRIMARY KEY, kind varchar(16) NOT NULL, "
+    "object_id bigint NOT NULL, title_id bigint, review_id bigint, "
+    "name text NOT NULL DEFAULT '', body text NOT NULL DEFAULT '', "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', body), 'B')) STORED)",
+    "CREATE INDEX search_index_document_idx ON search_index "
+    "USING GIN (document)",
+)
+KEYS = {'sqlite': 'rowid', 'postgresql': 'doc_id'}
+FILL_SQL = (
+    "INSERT INTO search_index ({key}, kind, object_id, title_id, review_id, "
+    "name, body) SELECT id * 4 + 1, 'title', id, id, NULL, name, description "
+    "FROM reviews_title",
+    "INSERT INTO search_index ({key}, kind, object_id, title_id, review_id, "
+    "name, body) SELECT id * 4 + 2, 'review', id, title_id, id, '', text "
+    "FROM reviews_review",
+    "INSERT INTO search_index ({key}, kind, object_id, title_id, review_id, "
+    "name, body) SELECT c.id * 4 + 3, 'comment', c.id, r.title_id, "
+    "c.review_id, '', c.text FROM reviews_comment c "
+    "JOIN reviews_review r ON r.id = c.review_id",
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in KEYS:
+        return
+    statements = SQLITE_SQL if vendor == 'sqlite' else POSTGRES_SQL
+    for statement in statements:
+        schema_editor.execute(statement)
+    for statement in FILL_SQL:
+        schema_editor.execute(statement.format(key=KEYS[vendor]))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in KEYS:
+        schema_editor.execute('DROP TABLE search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_year_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
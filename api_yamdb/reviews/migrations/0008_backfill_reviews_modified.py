@@ -0,0 +1,21 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    """Время изменения отзывов для произведений, созданных до 0005."""
+    Title = apps.get_model('reviews', 'Title')
+    Title.objects.filter(reviews_modified__isnull=True).update(
+        reviews_modified=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
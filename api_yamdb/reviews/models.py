@@ -1,5 +1,8 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
 
 from users.models import User
 from .validators import validate_year
@@ -30,6 +33,59 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def with_related(self):
+        """Категория подтягивается JOIN'ом, жанры - одним запросом."""
+        return self.select_related('category').prefetch_related('genre')
+
+    def shift_rating(self, score_delta, count_delta):
+        """Сдвигает хранимые сумму оценок и число отзывов одним UPDATE.
+
+        Заодно отмечается время последнего изменения отзывов.
+        Рейтинг пересчитывается в том же запросе: в правой части UPDATE
+        используются старые значения полей, поэтому дельты учтены явно.
+        """
+        return self.update(
+            score_sum=F('score_sum') + score_delta,
+            reviews_count=F('reviews_count') + count_delta,
+            rating=(
+                (F('score_sum') + score_delta)
+                / NullIf(F('reviews_count') + count_delta, 0)
+            ),
+            reviews_modified=timezone.now(),
+        )
+
+    def touch_reviews(self):
+        """Отмечает изменение отзывов или комментариев к произведению."""
+        return self.update(reviews_modified=timezone.now())
+
+    def rebuild_ratings(self):
+        """Пересчитывает рейтинг произведений с нуля по таблице отзывов.
+
+        Отзывы могли измениться в обход ORM (загрузка CSV), поэтому
+        время изменения отзывов тоже обновляется: иначе клиенты
+        продолжат получать 304 по старым ETag и Last-Modified.
+        """
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        self.update(
+            reviews_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('pk')).values('total')),
+                0
+            ),
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0
+            ),
+            reviews_modified=timezone.now(),
+        )
+        return self.update(
+            rating=F('score_sum') / NullIf(F('reviews_count'), 0)
+        )
+
+
 class Title(models.Model):
     name = models.CharField(
         max_length=256,
@@ -37,6 +93,7 @@ class Title(models.Model):
     )
     year = models.PositiveIntegerField(
         verbose_name='Год создания',
+        db_index=True,
         validators=[validate_year]
     )
     description = models.TextField(
@@ -55,6 +112,30 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Жанр'
     )
+    rating = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Рейтинг'
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    reviews_modified = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Последнее изменение отзывов и комментариев'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -92,6 +173,12 @@ class Review(models.Model):
             models.UniqueConstraint(
                 fields=['title', 'author'], name='unique_review')
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_keyset_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text
@@ -116,6 +203,12 @@ class Comment(models.Model):
         ordering = ['pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_keyset_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text
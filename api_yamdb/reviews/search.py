@@ -0,0 +1,241 @@
+"""Полнотекстовый поиск по произведениям, отзывам и комментариям.
+
+Документы хранятся в таблице `search_index` (для SQLite - виртуальная
+таблица FTS5, для PostgreSQL - таблица с колонкой tsvector и GIN-индексом)
+и обновляются сигналами (reviews/signals.py). Бэкенд выбирается по СУБД
+или задаётся настройкой SEARCH_BACKEND.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from .models import Comment, Review, Title
+
+KINDS = {'title': 1, 'review': 2, 'comment': 3}
+MODELS = {'title': Title, 'review': Review, 'comment': Comment}
+SNIPPET_WORDS = 12
+SNIPPET_START = '<b>'
+SNIPPET_END = '</b>'
+# СУБД размечает совпадения символами из области частного использования,
+# а теги подсветки ставятся после экранирования текста пользователя
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+
+def document_id(kind, object_id):
+    """Ключ документа: по нему запись находится без просмотра индекса."""
+    return object_id * 4 + KINDS[kind]
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def highlight(snippet):
+    """HTML фрагмента: экранированный текст с подсветкой совпадений."""
+    return escape(snippet).replace(MARK_START, SNIPPET_START).replace(
+        MARK_END, SNIPPET_END
+    )
+
+
+class SearchBackend:
+    columns = 'kind, object_id, title_id, review_id, name, body'
+    key_column = 'doc_id'
+
+    def index(self, kind, object_id, title_id, review_id, name='', body=''):
+        key = document_id(kind, object_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM search_index WHERE {self.key_column} = %s',
+                [key]
+            )
+            cursor.execute(
+                f'INSERT INTO search_index ({self.key_column}, '
+                f'{self.columns}) VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                [key, kind, object_id, title_id, review_id, name, body]
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM search_index WHERE {self.key_column} = %s',
+                [document_id(kind, object_id)]
+            )
+
+    def titles_sql(self):
+        return (
+            f'INSERT INTO search_index ({self.key_column}, {self.columns}) '
+            f"SELECT id * 4 + {KINDS['title']}, 'title', id, id, NULL, "
+            f'name, description FROM reviews_title'
+        )
+
+    def index_titles(self, title_ids, batch_size=500):
+        """Индексирует произведения пачками по два запроса на пачку."""
+        title_ids = list(title_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(title_ids), batch_size):
+                chunk = title_ids[start:start + batch_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM search_index '
+                    f'WHERE {self.key_column} IN ({placeholders})',
+                    [document_id('title', title_id) for title_id in chunk]
+                )
+                cursor.execute(
+                    f'{self.titles_sql()} WHERE id IN ({placeholders})',
+                    chunk
+                )
+
+    def rebuild(self):
+        """Заполняет индекс заново по таблицам произведений и отзывов."""
+        key = self.key_column
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_index')
+            cursor.execute(self.titles_sql())
+            cursor.execute(
+                f'INSERT INTO search_index ({key}, {self.columns}) '
+                f"SELECT id * 4 + {KINDS['review']}, 'review', id, title_id, "
+                f"id, '', text FROM reviews_review"
+            )
+            cursor.execute(
+                f'INSERT INTO search_index ({key}, {self.columns}) '
+                f"SELECT c.id * 4 + {KINDS['comment']}, 'comment', c.id, "
+                f"r.title_id, c.review_id, '', c.text FROM reviews_comment c "
+                f'JOIN reviews_review r ON r.id = c.review_id'
+            )
+
+    def search(self, query, kinds=None, limit=10, offset=0):
+        """Документы по убыванию релевантности.
+
+        Возвращается не больше `limit` документов, каждый - словарь с полями
+        kind, object_id, title_id, review_id, score и snippet.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+        sql, params = self.search_sql(terms, kinds)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit, offset])
+            rows = cursor.fetchall()
+        return [
+            {
+                'kind': kind,
+                'object_id': object_id,
+                'title_id': title_id,
+                'review_id': review_id,
+                'snippet': highlight(snippet),
+                'score': score,
+            }
+            for kind, object_id, title_id, review_id, snippet, score in rows
+        ]
+
+    def existing_sql(self):
+        """Соединение с таблицами, отсекающее документы удалённых объектов.
+
+        Индекс может отставать от таблиц, если данные менялись в обход
+        сигналов (массовая загрузка, очистка таблиц).
+        """
+        joins = ' '.join(
+            f'LEFT JOIN {model._meta.db_table} {kind}_row '
+            f"ON search_index.kind = '{kind}' "
+            f'AND {kind}_row.id = search_index.object_id'
+            for kind, model in MODELS.items()
+        )
+        alive = ', '.join(f'{kind}_row.id' for kind in MODELS)
+        return joins, f' AND COALESCE({alive}) IS NOT NULL'
+
+    def kinds_sql(self, kinds):
+        if not kinds:
+            return '', []
+        placeholders = ', '.join(['%s'] * len(kinds))
+        return f' AND search_index.kind IN ({placeholders})', list(kinds)
+
+    def search_sql(self, terms, kinds):
+        raise NotImplementedError
+
+    def title_ids_sql(self, terms):
+        """Подзапрос с id произведений, подходящих под поисковые слова."""
+        raise NotImplementedError
+
+
+class SqliteSearchBackend(SearchBackend):
+    """FTS5: ранжирование bm25, название весит больше текста."""
+    key_column = 'rowid'
+
+    def match(self, terms):
+        return ' '.join(f'"{term}"' for term in terms) + '*'
+
+    def search_sql(self, terms, kinds):
+        kinds_sql, kinds_params = self.kinds_sql(kinds)
+        joins, alive_sql = self.existing_sql()
+        return (
+            'SELECT search_index.kind, search_index.object_id, '
+            'search_index.title_id, search_index.review_id, '
+            f"snippet(search_index, -1, '{MARK_START}', "
+            f"'{MARK_END}', '…', {SNIPPET_WORDS}), "
+            '-bm25(search_index, 0, 0, 0, 0, 10.0, 1.0) AS score '
+            f'FROM search_index {joins} WHERE search_index MATCH %s'
+            f'{kinds_sql}{alive_sql} ORDER BY score DESC LIMIT %s OFFSET %s',
+            [self.match(terms), *kinds_params]
+        )
+
+    def title_ids_sql(self, terms):
+        return (
+            'SELECT object_id FROM search_index '
+            "WHERE search_index MATCH %s AND kind = 'title'",
+            [self.match(terms)]
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector с весами A (название) и B (текст), ранжирование ts_rank."""
+    config = 'simple'
+
+    def tsquery(self, terms):
+        return ' & '.join(terms) + ':*'
+
+    def search_sql(self, terms, kinds):
+        kinds_sql, kinds_params = self.kinds_sql(kinds)
+        joins, alive_sql = self.existing_sql()
+        return (
+            'SELECT search_index.kind, search_index.object_id, '
+            'search_index.title_id, search_index.review_id, '
+            f"ts_headline('{self.config}', "
+            "concat_ws(' ', search_index.name, search_index.body), q, "
+            f"'StartSel={MARK_START}, StopSel={MARK_END}, "
+            f"MaxWords={SNIPPET_WORDS}, MinWords=3'), "
+            'ts_rank(search_index.document, q) AS score '
+            f"FROM to_tsquery('{self.config}', %s) q, search_index {joins} "
+            f'WHERE search_index.document @@ q{kinds_sql}{alive_sql} '
+            'ORDER BY score DESC LIMIT %s OFFSET %s',
+            [self.tsquery(terms), *kinds_params]
+        )
+
+    def title_ids_sql(self, terms):
+        return (
+            'SELECT object_id FROM search_index '
+            f"WHERE document @@ to_tsquery('{self.config}', %s) "
+            "AND kind = 'title'",
+            [self.tsquery(terms)]
+        )
+
+
+BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor not in BACKENDS:
+        raise ImproperlyConfigured(
+            f'Полнотекстовый поиск не поддерживается для {connection.vendor}'
+        )
+    return BACKENDS[connection.vendor]()
@@ -0,0 +1,156 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import User
+from .models import Comment, Review, Title
+from .search import get_backend
+from .trigrams import loaded_index
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_score(sender, instance, **kwargs):
+    """Запоминаем оценку и произведение до изменения отзыва."""
+    instance._previous = None
+    if instance.pk is not None and not kwargs.get('raw'):
+        instance._previous = Review.objects.filter(
+            pk=instance.pk
+        ).values_list('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    """Инкрементально обновляем рейтинг произведения."""
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_previous', None)
+    if created or previous is None:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            instance.score, 1
+        )
+        return
+    previous_title_id, previous_score = previous
+    if previous_title_id != instance.title_id:
+        Title.objects.filter(pk=previous_title_id).shift_rating(
+            -previous_score, -1
+        )
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            instance.score, 1
+        )
+    else:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            instance.score - previous_score, 0
+        )
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Вычитаем удалённый отзыв из рейтинга.
+
+    При каскадном удалении произведения UPDATE просто не найдёт строку.
+    """
+    Title.objects.filter(pk=instance.title_id).shift_rating(
+        -instance.score, -1
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_title_on_comment(sender, instance, **kwargs):
+    """Комментарий меняет ленту отзывов произведения."""
+    if kwargs.get('raw'):
+        return
+    Title.objects.filter(reviews__id=instance.review_id).touch_reviews()
+
+
+# Поля автора в ответах отзывов и комментариев (author и ?expand=author)
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'bio')
+
+
+@receiver(pre_save, sender=User)
+def remember_author_fields(sender, instance, **kwargs):
+    instance._previous_author = None
+    if instance.pk is not None and not kwargs.get('raw'):
+        instance._previous_author = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def touch_titles_on_author_change(sender, instance, **kwargs):
+    """Переименование автора меняет ленты отзывов его произведений.
+
+    ETag и Last-Modified лент строятся по reviews_modified, поэтому оно
+    обновляется у всех произведений с отзывами и комментариями автора.
+    """
+    previous = getattr(instance, '_previous_author', None)
+    if previous is None or previous == tuple(
+            getattr(instance, field) for field in AUTHOR_FIELDS):
+        return
+    Title.objects.filter(
+        Q(pk__in=Review.objects.filter(author=instance).values('title_id'))
+        | Q(pk__in=Comment.objects.filter(author=instance).values(
+            'review__title_id'
+        ))
+    ).touch_reviews()
+
+
+@receiver(pre_save, sender=Title)
+def remember_previous_name(sender, instance, **kwargs):
+    """Старое название нужно, чтобы убрать его из триграммного индекса."""
+    instance._previous_name = None
+    if instance.pk is not None and loaded_index() is not None:
+        instance._previous_name = Title.objects.filter(
+            pk=instance.pk
+        ).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Title)
+def update_trigram_index(sender, instance, **kwargs):
+    """Обновляем индекс, только если процесс его уже загрузил."""
+    index = loaded_index()
+    if index is None:
+        return
+    previous_name = getattr(instance, '_previous_name', None)
+    if previous_name is None:
+        index.add(instance.pk, instance.name)
+    elif previous_name != instance.name:
+        index.replace(instance.pk, previous_name, instance.name)
+
+
+@receiver(post_delete, sender=Title)
+def remove_from_trigram_index(sender, instance, **kwargs):
+    index = loaded_index()
+    if index is not None:
+        index.remove(instance.pk, instance.name)
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    get_backend().index(
+        'title', instance.pk, instance.pk, None,
+        name=instance.name, body=instance.description
+    )
+
+
+@receiver(post_save, sender=Review)
+def index_review(sender, instance, **kwargs):
+    get_backend().index(
+        'review', instance.pk, instance.title_id, instance.pk,
+        body=instance.text
+    )
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    get_backend().index(
+        'comment', instance.pk, instance.review.title_id, instance.review_id,
+        body=instance.text
+    )
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def unindex(sender, instance, **kwargs):
+    get_backend().remove(sender._meta.model_name, instance.pk)
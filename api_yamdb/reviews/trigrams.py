@@ -0,0 +1,342 @@
+"""Нечёткий поиск произведений по названию на основе триграмм.
+
+Индекс хранится в памяти процесса: произведения пронумерованы плотными
+позициями (id произведения по позиции - в `ids`), для каждой триграммы
+хранится массив позиций (array('I')), для каждой позиции - число триграмм
+названия. Память поэтому зависит от числа произведений, а не от
+наибольшего id. Индекс сохраняется в файл TRIGRAM_INDEX_PATH теми же
+массивами, и при старте воркер загружает его без чтения таблицы.
+
+Сигналы (reviews/signals.py) обновляют индекс только в том процессе, где
+изменилось произведение. Остальные процессы видят изменения, только
+когда команда build-trigram-index перезапишет файл: get_index() сверяет
+время изменения файла при каждом вызове и перечитывает его. До пересборки
+нечёткий поиск в них работает по предыдущей версии файла.
+"""
+import json
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+
+from django.conf import settings
+
+# Сигнатура, версия формата, длина JSON-заголовка
+HEADER = struct.Struct('<4sII')
+MAGIC = b'TRGM'
+FORMAT_VERSION = 2
+SIMILARITY_THRESHOLD = 0.3
+# Сколько позиций из списков редких триграмм просматривается при поиске
+CANDIDATE_BUDGET = 10_000
+MAX_CANDIDATES = 400
+DENSE_RATIO = 32
+
+
+def trigrams(text):
+    """Множество триграмм строки, как в pg_trgm: слова дополняются
+    двумя пробелами слева и одним справа."""
+    result = set()
+    for word in re.findall(r'\w+', text.lower()):
+        padded = f'  {word} '
+        result.update(
+            padded[index:index + 3] for index in range(len(padded) - 2)
+        )
+    return result
+
+
+def read_array(file, typecode, count, swap):
+    values = array(typecode)
+    values.fromfile(file, count)
+    if swap:
+        values.byteswap()
+    return values
+
+
+class TrigramIndex:
+    """Инвертированный индекс триграмм.
+
+    Позиции выдаются по порядку добавления. Пока id растут (а build_index
+    читает таблицу по возрастанию id), `ids` отсортирован и позиция id
+    ищется двоичным поиском; id, добавленные не по порядку, запоминаются
+    в словаре `unordered` до следующей пересборки. Позиция удалённого
+    произведения остаётся занятой с нулевой длиной.
+
+    Списки позиций в `postings` отсортированы, для частых триграмм (больше
+    1/DENSE_RATIO всех произведений) дополнительно хранится битовая карта:
+    она не больше самого списка, покрывает все позиции и проверяет
+    вхождение за O(1).
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.bitmaps = {}
+        self.ids = array('Q')
+        self.lengths = array('H')
+        self.ordered = 0
+        self.unordered = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return sum(1 for length in self.lengths if length)
+
+    def position(self, title_id):
+        """Позиция произведения или None, если её ещё нет."""
+        position = self.unordered.get(title_id)
+        if position is not None:
+            return position
+        position = bisect_left(self.ids, title_id, 0, self.ordered)
+        if position < self.ordered and self.ids[position] == title_id:
+            return position
+        return None
+
+    def allocate(self, title_id):
+        position = len(self.ids)
+        if position == self.ordered and (
+                not position or self.ids[-1] < title_id):
+            self.ordered += 1
+        else:
+            self.unordered[title_id] = position
+        self.ids.append(title_id)
+        self.lengths.append(0)
+        if not position & 7:
+            for bitmap in self.bitmaps.values():
+                bitmap.append(0)
+        return position
+
+    def add(self, title_id, name):
+        grams = trigrams(name)
+        with self.lock:
+            position = self.position(title_id)
+            if position is None:
+                position = self.allocate(title_id)
+            elif self.lengths[position]:
+                return
+            self.lengths[position] = min(len(grams), 0xFFFF)
+            for gram in grams:
+                posting = self.postings.setdefault(gram, array('I'))
+                if not posting or posting[-1] < position:
+                    posting.append(position)
+                else:
+                    insort(posting, position)
+                bitmap = self.bitmaps.get(gram)
+                if bitmap is not None:
+                    bitmap[position >> 3] |= 1 << (position & 7)
+
+    def remove(self, title_id, name):
+        with self.lock:
+            position = self.position(title_id)
+            if position is None or not self.lengths[position]:
+                return
+            self.lengths[position] = 0
+            for gram in trigrams(name):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    continue
+                offset = bisect_left(posting, position)
+                if offset == len(posting) or posting[offset] != position:
+                    continue
+                del posting[offset]
+                bitmap = self.bitmaps.get(gram)
+                if bitmap is not None:
+                    bitmap[position >> 3] &= ~(1 << (position & 7))
+                if not posting:
+                    del self.postings[gram]
+                    self.bitmaps.pop(gram, None)
+
+    def replace(self, title_id, old_name, name):
+        self.remove(title_id, old_name)
+        self.add(title_id, name)
+
+    def build_bitmaps(self):
+        """Битовые карты для триграмм, встречающихся чаще 1/DENSE_RATIO."""
+        size = (len(self.ids) >> 3) + 1
+        self.bitmaps = {}
+        for gram, posting in self.postings.items():
+            if len(posting) * DENSE_RATIO < len(self.ids):
+                continue
+            bitmap = bytearray(size)
+            for position in posting:
+                bitmap[position >> 3] |= 1 << (position & 7)
+            self.bitmaps[gram] = bitmap
+
+    def search(self, query, limit=20, threshold=SIMILARITY_THRESHOLD):
+        """Пары (id, сходство) по убыванию сходства.
+
+        Сходство - коэффициент Жаккара по множествам триграмм, как
+        similarity() в pg_trgm. Кандидаты набираются из самых редких
+        триграмм запроса, пока не просмотрено CANDIDATE_BUDGET позиций, и
+        только MAX_CANDIDATES лучших из них проверяются по остальным
+        триграммам. Поиск поэтому приближённый, зато время ответа не
+        зависит от того, насколько частые слова в запросе.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        postings = sorted(
+            ((gram, self.postings.get(gram, ())) for gram in grams),
+            key=lambda item: len(item[1])
+        )
+        counts = Counter()
+        scanned = probed = 0
+        for _, posting in postings:
+            if probed and scanned + len(posting) > CANDIDATE_BUDGET:
+                break
+            counts.update(posting)
+            scanned += len(posting)
+            probed += 1
+        candidates = counts.most_common(max(MAX_CANDIDATES, limit))
+        positions = [position for position, _ in candidates]
+        shared = [count for _, count in candidates]
+        # Остальные триграммы проверяются сразу для всех кандидатов
+        for gram, posting in postings[probed:]:
+            bitmap = self.bitmaps.get(gram)
+            if bitmap is not None:
+                shared = [
+                    count + (bitmap[position >> 3] >> (position & 7) & 1)
+                    for position, count in zip(positions, shared)
+                ]
+                continue
+            size = len(posting)
+            for number, position in enumerate(positions):
+                offset = bisect_left(posting, position)
+                if offset < size and posting[offset] == position:
+                    shared[number] += 1
+        query_length = len(grams)
+        lengths = self.lengths
+        results = []
+        for position, count in zip(positions, shared):
+            similarity = count / (query_length + lengths[position] - count)
+            if similarity >= threshold:
+                results.append((self.ids[position], similarity))
+        return nlargest(limit, results, key=lambda item: item[1])
+
+    def dump(self, path):
+        """Сохраняет индекс: заголовок JSON и массивы как есть.
+
+        Заголовок - ключи триграмм, порядок байт и размеры массивов; за ним
+        смещения списков, единый массив позиций, `ids`, `lengths` и битовые
+        карты. Файл читается без pickle, поэтому его подмена не приводит к
+        выполнению кода.
+        """
+        with self.lock:
+            keys = list(self.postings)
+            offsets = array('Q', [0])
+            positions = array('I')
+            for key in keys:
+                positions.extend(self.postings[key])
+                offsets.append(len(positions))
+            dense = list(self.bitmaps)
+            header = json.dumps({
+                'byteorder': sys.byteorder,
+                'keys': keys,
+                'titles': len(self.ids),
+                'ordered': self.ordered,
+                'unordered': list(self.unordered.items()),
+                'dense': dense,
+                'bitmaps': [len(self.bitmaps[key]) for key in dense],
+            }).encode('utf-8')
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(header)))
+                file.write(header)
+                offsets.tofile(file)
+                positions.tofile(file)
+                self.ids.tofile(file)
+                self.lengths.tofile(file)
+                for key in dense:
+                    file.write(self.bitmaps[key])
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            magic, version, size = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(
+                    'Неподдерживаемый формат триграммного индекса'
+                )
+            header = json.loads(file.read(size))
+            swap = header['byteorder'] != sys.byteorder
+            keys, titles = header['keys'], header['titles']
+            offsets = read_array(file, 'Q', len(keys) + 1, swap)
+            positions = read_array(file, 'I', offsets[-1], swap)
+            index = cls()
+            index.ids = read_array(file, 'Q', titles, swap)
+            index.lengths = read_array(file, 'H', titles, swap)
+            index.bitmaps = {
+                key: bytearray(file.read(length))
+                for key, length in zip(header['dense'], header['bitmaps'])
+            }
+        index.postings = {
+            key: positions[offsets[number]:offsets[number + 1]]
+            for number, key in enumerate(keys)
+        }
+        index.ordered = header['ordered']
+        index.unordered = dict(header['unordered'])
+        return index
+
+    @classmethod
+    def build(cls, titles):
+        """Строит индекс по парам (id, название), лучше - по возрастанию id."""
+        index = cls()
+        for title_id, name in titles:
+            index.add(title_id, name)
+        index.build_bitmaps()
+        return index
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def build_index():
+    from .models import Title
+    return TrigramIndex.build(
+        Title.objects.order_by('id').values_list(
+            'id', 'name'
+        ).iterator(chunk_size=10000)
+    )
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_index():
+    """Индекс процесса: из файла, а если его нет - по таблице.
+
+    Если файл появился или перезаписан после загрузки, индекс
+    перечитывается; изменения, внесённые сигналами в этом процессе,
+    при этом заменяются содержимым файла.
+    """
+    global _index, _index_mtime
+    mtime = file_mtime(settings.TRIGRAM_INDEX_PATH)
+    if _index is None or mtime != _index_mtime:
+        with _index_lock:
+            if _index is None or mtime != _index_mtime:
+                if mtime is None:
+                    _index = build_index()
+                else:
+                    _index = TrigramIndex.load(settings.TRIGRAM_INDEX_PATH)
+                _index_mtime = mtime
+    return _index
+
+
+def loaded_index():
+    """Индекс процесса, если он уже загружен, иначе None."""
+    return _index
+
+
+def reset_index():
+    global _index, _index_mtime
+    _index = None
+    _index_mtime = None
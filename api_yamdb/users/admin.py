@@ -1,5 +1,12 @@
 from django.contrib import admin
 
-from .models import User
+from .models import OutgoingEmail, User
 
 admin.site.register(User)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'created', 'attempts', 'sent', 'next_attempt')
+    list_filter = ('sent',)
+    readonly_fields = ('created',)
@@ -0,0 +1,116 @@
+"""Очередь исходящих писем.
+
+`enqueue_mail` только сохраняет письмо в таблицу, отправляет его команда
+send-queued-mail: пачками по одному соединению с почтовым сервером,
+с повторами через экспоненциально растущие интервалы. При
+MAIL_QUEUE_EAGER письмо отправляется сразу, как до появления очереди.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+# Ошибки, после которых письмо уходит на повтор: smtplib.SMTPException
+# и ошибки файлового бэкенда - подклассы OSError
+MAIL_ERRORS = (OSError,)
+
+
+def enqueue_mail(subject, body, from_email, recipients):
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        recipients=list(recipients),
+    )
+    if settings.MAIL_QUEUE_EAGER:
+        deliver([email])
+    return email
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: 1, 2, 4... интервала, не больше 64."""
+    return timedelta(
+        seconds=settings.MAIL_QUEUE_RETRY_DELAY * 2 ** min(attempts - 1, 6)
+    )
+
+
+def claim_batch(batch_size):
+    """Забирает из очереди пачку писем, которым пора уходить.
+
+    Выбранным письмам время попытки сдвигается на MAIL_QUEUE_LEASE вперёд,
+    чтобы их не взял параллельно работающий воркер; если воркер упадёт,
+    письма вернутся в очередь по истечении этого срока.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt__lte=now)
+            .order_by('next_attempt')[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(
+            next_attempt=now + timedelta(seconds=settings.MAIL_QUEUE_LEASE)
+        )
+    return emails
+
+
+def deliver(emails):
+    """Отправляет письма через одно соединение, возвращает число успешных."""
+    connection = get_connection()
+    try:
+        connection.open()
+    except MAIL_ERRORS as error:
+        for email in emails:
+            reschedule(email, error)
+        return 0
+    sent = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email,
+                email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except MAIL_ERRORS as error:
+                reschedule(email, error)
+            else:
+                sent += 1
+                email.attempts += 1
+                email.sent = timezone.now()
+                email.next_attempt = None
+                email.save(update_fields=['attempts', 'sent', 'next_attempt'])
+    finally:
+        connection.close()
+    return sent
+
+
+def reschedule(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.next_attempt = (
+        timezone.now() + retry_delay(email.attempts)
+        if email.attempts < settings.MAIL_QUEUE_MAX_ATTEMPTS else None
+    )
+    email.save(update_fields=['attempts', 'last_error', 'next_attempt'])
+
+
+def process_queue(batch_size=None):
+    """Разбирает очередь до конца, возвращает число взятых и отправленных."""
+    batch_size = batch_size or settings.MAIL_QUEUE_BATCH_SIZE
+    claimed = sent = 0
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            return claimed, sent
+        claimed += len(emails)
+        sent += deliver(emails)
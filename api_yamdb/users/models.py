@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -22,6 +23,30 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0,
+        editable=False,
+    )
+
+    @classmethod
+    def from_token(cls, user_id, role, is_superuser):
+        """Пользователь по данным из токена, без запроса к базе.
+
+        Остальные поля отложены: первое обращение к любому из них
+        загружает их все одним запросом.
+        """
+        return cls.from_db(
+            None,
+            ['id', 'role', 'is_superuser'],
+            [user_id, role, is_superuser]
+        )
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Отложенные поля догружаются все сразу, а не по одному запросу
+        if fields is not None:
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields)
 
     @property
     def staff_permission(self):
@@ -31,3 +56,34 @@ class User(AbstractUser):
     @property
     def admin_permission(self):
         return self.role == self.ADMIN_ROLE or self.is_superuser
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку.
+
+    `next_attempt` - время следующей попытки; у отправленных писем и писем,
+    исчерпавших попытки, оно пустое, поэтому очередь - это строки с
+    `next_attempt <= now`.
+    """
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.JSONField('Получатели')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    next_attempt = models.DateTimeField(
+        'Следующая попытка',
+        null=True,
+        default=timezone.now,
+        db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    sent = models.DateTimeField('Отправлено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ['next_attempt']
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.recipients)}'
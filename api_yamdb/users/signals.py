@@ -0,0 +1,51 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import User
+from .tokens import REVOKED, TOKEN_FIELDS, store_token_version
+
+
+@receiver(pre_save, sender=User)
+def bump_token_version(sender, instance, update_fields=None, **kwargs):
+    """Отзываем токены, если изменились данные, записанные в них.
+
+    Учитываются только сохраняемые поля. Если `update_fields` не содержит
+    token_version, новая версия записывается отдельным запросом: иначе
+    в базе осталась бы старая, а в кэш попала бы новая, и отозванные
+    токены снова принимались бы после истечения кэша.
+    """
+    if instance.pk is None or kwargs.get('raw'):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(
+        'token_version', *TOKEN_FIELDS
+    ).first()
+    if previous is None:
+        return
+    instance.token_version = previous['token_version']
+    fields = [
+        field for field in TOKEN_FIELDS
+        if update_fields is None or field in update_fields
+    ]
+    if all(previous[field] == getattr(instance, field) for field in fields):
+        return
+    if update_fields is None or 'token_version' in update_fields:
+        instance.token_version += 1
+        return
+    users = User.objects.filter(pk=instance.pk)
+    users.update(token_version=F('token_version') + 1)
+    instance.token_version = users.values_list(
+        'token_version', flat=True
+    ).get()
+
+
+@receiver(post_save, sender=User)
+def cache_token_version(sender, instance, **kwargs):
+    store_token_version(
+        instance.pk, instance.token_version if instance.is_active else REVOKED
+    )
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens(sender, instance, **kwargs):
+    store_token_version(instance.pk, REVOKED)
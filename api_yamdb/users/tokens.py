@@ -0,0 +1,41 @@
+"""Версии токенов пользователей.
+
+Роль и флаг суперпользователя записываются в JWT, поэтому при их
+изменении (а также при блокировке и удалении пользователя) номер версии
+в таблице увеличивается, и выданные ранее токены перестают приниматься.
+Текущая версия кэшируется, чтобы не читать её из базы на каждый запрос.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+# Поля, изменение которых отзывает выданные токены
+TOKEN_FIELDS = ('role', 'is_superuser', 'is_active')
+REVOKED = -1
+
+
+def get_cache():
+    return caches[settings.TOKEN_VERSION_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def store_token_version(user_id, version):
+    get_cache().set(
+        version_key(user_id), version, settings.TOKEN_VERSION_CACHE_TIMEOUT
+    )
+
+
+def current_token_version(user_id):
+    """Версия токенов пользователя или REVOKED для удалённых и
+    заблокированных."""
+    version = get_cache().get(version_key(user_id))
+    if version is None:
+        from .models import User
+        row = User.objects.filter(pk=user_id).values_list(
+            'token_version', 'is_active'
+        ).first()
+        version = row[0] if row and row[1] else REVOKED
+        store_token_version(user_id, version)
+    return version
@@ -0,0 +1,470 @@
+"""Нагрузочный бенчмарк REST API.
+
+Готовит базу SQLite из синтетического набора (benchmarks/synthetic.py)
+и прогоняет сценарии: просмотр произведений с фильтрами, страницы
+отзывов, регистрацию с получением токена и запись администратором.
+Запросы идут в WSGI-приложение в том же процессе (django.test.Client)
+или через локальный HTTP-сервер (--transport http). Для каждого
+сценария и адреса считаются p50/p95/p99 задержки, запросы в секунду и
+SQL-запросы на запрос (из заголовка Server-Timing, api/metrics.py).
+Результат сохраняется в JSON; --compare сравнивает его с прошлым.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.api_load --db bench.sqlite3 --titles 10000 \\
+        --reviews 1000000 --comments 5000000 --output run.json
+    python -m benchmarks.api_load --db bench.sqlite3 --transport http \\
+        --concurrency 8 --output run-http.json --compare run.json
+
+База из --db создаётся один раз и используется повторно.
+"""
+import argparse
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+from benchmarks.synthetic import scale_dataset, size_arguments, sizes_from
+from benchmarks.utils import ROOT_DIR, disable_throttling, setup_django
+
+WORKLOADS = ('browse', 'reviews', 'auth', 'admin')
+PERCENTILES = (50, 95, 99)
+QUERIES = re.compile(r'desc="(\d+) queries"')
+DEFAULT_SIZES = {'titles': 10_000, 'review': 100_000, 'comments': 200_000}
+
+
+class Response:
+
+    def __init__(self, status, body, server_timing):
+        self.status = status
+        self.body = body
+        self.server_timing = server_timing or ''
+
+    def json(self):
+        return json.loads(self.body)
+
+    @property
+    def queries(self):
+        match = QUERIES.search(self.server_timing)
+        return int(match.group(1)) if match else None
+
+
+class InProcessTransport:
+    """WSGI-обработчик Django без сети, свой клиент на каждый поток."""
+    name = 'in-process'
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, data=None, token=None):
+        from django.test import Client
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            # Необработанное исключение представления - ответ 500, как
+            # у настоящего сервера, а не исключение в потоке нагрузки
+            client = self.local.client = Client(
+                raise_request_exception=False
+            )
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        response = client.generic(
+            method, path, json.dumps(data) if data is not None else '',
+            content_type='application/json', **extra
+        )
+        return Response(
+            response.status_code, response.content,
+            response.get('Server-Timing')
+        )
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """Локальный многопоточный сервер runserver на свободном порту."""
+    name = 'http'
+
+    def __init__(self):
+        from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                                  WSGIRequestHandler)
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(get_wsgi_application())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+        self.port = self.server.server_address[1]
+
+    def request(self, method, path, data=None, token=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        try:
+            connection.request(
+                method, path,
+                json.dumps(data) if data is not None else None, headers
+            )
+            response = connection.getresponse()
+            return Response(
+                response.status, response.read(),
+                response.getheader('Server-Timing')
+            )
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def prepare_database(sizes, workers):
+    """Заполняет новую базу синтетическими данными."""
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        written = scale_dataset(data_dir, 1, sizes=sizes)
+        print('данные:', ', '.join(
+            f'{table} {rows}' for table, rows in written.items()
+        ))
+        call_command(
+            'csv-in-bd', path=data_dir, workers=workers,
+            stdout=io.StringIO()
+        )
+
+
+class Workloads:
+    """Сценарии нагрузки. Сценарий - генератор: выдаёт запросы
+    (метка, метод, путь, данные, токен) и получает ответы на них."""
+
+    def __init__(self, rng):
+        from django.contrib.auth import get_user_model
+        from django.db.models import Count
+        from api.authentication import access_token_for
+        from reviews.models import Category, Genre, Review, Title
+
+        self.rng = rng
+        self.run_id = uuid.uuid4().hex[:8]
+        self.counter = 0
+        self.lock = threading.Lock()
+        self.title_ids = list(Title.objects.values_list('id', flat=True))
+        self.names = list(
+            Title.objects.order_by('?').values_list('name', flat=True)[:1000]
+        )
+        self.years = sorted(set(
+            Title.objects.values_list('year', flat=True)
+        ))
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        self.categories = list(
+            Category.objects.values_list('slug', flat=True)
+        )
+        self.reviewed = list(
+            Review.objects.values('title_id').annotate(
+                total=Count('id')
+            ).values_list('title_id', 'total')
+        )
+        self.review_ids = list(
+            Review.objects.filter(comments__isnull=False).values_list(
+                'title_id', 'id'
+            ).distinct()[:1000]
+        )
+        User = get_user_model()
+        admin, _ = User.objects.get_or_create(
+            username='bench_admin',
+            defaults={'email': 'bench_admin@yamdb.fake', 'role': 'admin'}
+        )
+        self.admin_token = str(access_token_for(admin))
+
+    def unique(self):
+        with self.lock:
+            self.counter += 1
+            return f'bench{self.run_id}{self.counter}'
+
+    def browse(self):
+        rng = self.rng
+        page = rng.randint(1, max(1, len(self.title_ids) // 5))
+        queries = [
+            ('titles-list', f'/api/v1/titles/?page={page}'),
+            ('titles-genre',
+             f'/api/v1/titles/?genre={rng.choice(self.genres)}'),
+            ('titles-category',
+             f'/api/v1/titles/?category={rng.choice(self.categories)}'),
+            ('titles-year',
+             f'/api/v1/titles/?year={rng.choice(self.years)}'),
+            ('titles-name',
+             f'/api/v1/titles/?name={quote(rng.choice(self.names)[:6])}'),
+            ('titles-detail',
+             f'/api/v1/titles/{rng.choice(self.title_ids)}/'),
+        ]
+        label, path = rng.choice(queries)
+        yield label, 'GET', path, None, None
+
+    def reviews(self):
+        rng = self.rng
+        title_id, total = rng.choice(self.reviewed)
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        if rng.random() < 0.5:
+            page = rng.randint(1, max(1, math.ceil(total / 5)))
+            yield 'reviews-page', 'GET', f'{url}?page={page}', None, None
+            return
+        path = f'{url}?pagination=cursor'
+        for _ in range(3):
+            response = yield 'reviews-cursor', 'GET', path, None, None
+            following = response.status == 200 and response.json()['next']
+            if not following:
+                break
+            parts = urlsplit(following)
+            path = f'{parts.path}?{parts.query}'
+        if self.review_ids:
+            title_id, review_id = rng.choice(self.review_ids)
+            yield ('comments-list', 'GET',
+                   f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+                   'comments/', None, None)
+
+    def auth(self):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.tokens import default_token_generator
+        username = self.unique()
+        yield ('auth-signup', 'POST', '/api/v1/auth/signup/',
+               {'username': username, 'email': f'{username}@yamdb.fake'},
+               None)
+        user = get_user_model().objects.get(username=username)
+        code = default_token_generator.make_token(user)
+        yield ('auth-token', 'POST', '/api/v1/auth/token/',
+               {'username': username, 'confirmation_code': code}, None)
+
+    def admin(self):
+        rng = self.rng
+        token = self.admin_token
+        response = yield ('admin-create', 'POST', '/api/v1/titles/', {
+            'name': self.unique(),
+            'year': rng.choice(self.years),
+            'description': 'Произведение из нагрузочного теста',
+            'genre': rng.sample(self.genres, 2),
+            'category': rng.choice(self.categories),
+        }, token)
+        if response.status != 201:
+            return
+        url = f'/api/v1/titles/{response.json()["id"]}/'
+        yield 'admin-update', 'PATCH', url, {'name': self.unique()}, token
+        yield 'admin-delete', 'DELETE', url, None, token
+
+
+def run_scenario(scenario, transport):
+    """Выполняет один проход сценария: [(метка, статус, время, SQL)].
+
+    Исключение транспорта (обрыв соединения, ошибка сервера) записывается
+    со статусом None и считается ошибкой; проход сценария на этом
+    заканчивается. Так же заканчивается проход, если сценарий не смог
+    разобрать ответ с ошибкой.
+    """
+    samples = []
+    steps = scenario()
+    response = None
+    while True:
+        try:
+            label, method, path, data, token = steps.send(response)
+        except StopIteration:
+            break
+        except Exception:
+            if response is None or response.status < 400:
+                raise
+            break
+        started = time.perf_counter()
+        try:
+            response = transport.request(method, path, data, token)
+        except Exception:
+            samples.append((label, None, time.perf_counter() - started, None))
+            steps.close()
+            break
+        samples.append((
+            label, response.status, time.perf_counter() - started,
+            response.queries
+        ))
+    return samples
+
+
+def percentile(values, rank):
+    """Процентиль методом ближайшего ранга по отсортированному списку."""
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+def summarize(samples, duration):
+    latencies = sorted(latency * 1000 for _, _, latency, _ in samples)
+    queries = [count for _, _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(
+            1 for _, status, _, _ in samples
+            if status is None or status >= 400
+        ),
+        'rps': round(len(samples) / duration, 1) if duration else None,
+        'latency_ms': {
+            **{f'p{rank}': round(percentile(latencies, rank), 2)
+               for rank in PERCENTILES},
+            'mean': round(sum(latencies) / len(latencies), 2),
+            'max': round(latencies[-1], 2),
+        },
+        'queries_per_request': (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+    }
+
+
+def run_workload(scenario, transport, iterations, concurrency):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        batches = list(executor.map(
+            lambda _: run_scenario(scenario, transport), range(iterations)
+        ))
+    duration = time.perf_counter() - started
+    samples = [sample for batch in batches for sample in batch]
+    by_label = defaultdict(list)
+    for sample in samples:
+        by_label[sample[0]].append(sample)
+    result = summarize(samples, duration)
+    result['duration_s'] = round(duration, 3)
+    result['endpoints'] = {
+        label: summarize(label_samples, duration)
+        for label, label_samples in sorted(by_label.items())
+    }
+    return result
+
+
+def table_sizes():
+    from django.contrib.auth import get_user_model
+    from reviews.models import Comment, Review, Title
+    return {
+        'titles': Title.objects.count(),
+        'review': Review.objects.count(),
+        'comments': Comment.objects.count(),
+        'users': get_user_model().objects.count(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, previous=None):
+    def delta(value, old):
+        if not old or value is None:
+            return ''
+        return f' ({(value - old) / old:+.0%})'
+
+    for name, result in report['workloads'].items():
+        old = (previous or {}).get('workloads', {}).get(name, {})
+        latency = result['latency_ms']
+        old_latency = old.get('latency_ms', {})
+        queries = result['queries_per_request']
+        print(
+            f'{name:>8}: {result["requests"]} запросов, '
+            f'ошибок {result["errors"]}, '
+            f'{result["rps"]} з/с{delta(result["rps"], old.get("rps"))}, '
+            + ', '.join(
+                f'p{rank} {latency[f"p{rank}"]} мс'
+                f'{delta(latency[f"p{rank}"], old_latency.get(f"p{rank}"))}'
+                for rank in PERCENTILES
+            )
+            + f', SQL/запрос {queries}'
+            f'{delta(queries, old.get("queries_per_request"))}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--db', default='bench.sqlite3',
+                        help='Файл базы; создаётся, если его нет')
+    size_arguments(parser)
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Потоки загрузки данных при создании базы')
+    parser.add_argument('--workload', action='append', choices=WORKLOADS,
+                        help='Сценарий (можно несколько), по умолчанию все')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Проходов каждого сценария')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--transport', choices=('in-process', 'http'),
+                        default='in-process')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона')
+    options = parser.parse_args()
+
+    db_name = os.path.abspath(options.db)
+    exists = os.path.exists(db_name)
+    setup_django(db_name)
+    from django.conf import settings
+    # Без списка выполненных запросов DEBUG не тормозит долгие прогоны
+    settings.DEBUG = False
+    settings.TRIGRAM_INDEX_PATH = f'{db_name}.trigrams'
+    disable_throttling()
+    if not exists:
+        prepare_database(
+            {**DEFAULT_SIZES, **sizes_from(options)}, options.workers
+        )
+
+    rng = random.Random(options.seed)
+    workloads = Workloads(rng)
+    transport = (HttpTransport if options.transport == 'http'
+                 else InProcessTransport)()
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'transport': transport.name,
+            'concurrency': options.concurrency,
+            'iterations': options.iterations,
+            'seed': options.seed,
+            'python': platform.python_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'sizes': table_sizes(),
+        },
+        'workloads': {},
+    }
+    try:
+        for name in options.workload or WORKLOADS:
+            report['workloads'][name] = run_workload(
+                getattr(workloads, name), transport,
+                options.iterations, options.concurrency
+            )
+    finally:
+        transport.close()
+
+    previous = None
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as file:
+            previous = json.load(file)
+    print_report(report, previous)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Сравнение последовательной и параллельной загрузки csv-in-bd.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.csv_import --factor 100 --workers 4
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import scale_dataset
+from benchmarks.utils import setup_django
+
+
+def run_import(db_name, data_dir, workers, batch_size):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections, connection
+
+    connections.close_all()
+    connection.settings_dict['NAME'] = db_name
+    # csv-in-bd пересобирает триграммный индекс: файл должен остаться во
+    # временном каталоге, а не перезаписать индекс приложения
+    settings.TRIGRAM_INDEX_PATH = f'{db_name}.trigrams'
+    call_command('migrate', verbosity=0)
+    started = time.perf_counter()
+    call_command(
+        'csv-in-bd',
+        path=data_dir,
+        workers=workers,
+        batch_size=batch_size,
+        stdout=io.StringIO(),
+    )
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--factor', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bootstrap.sqlite3'))
+        data_dir = os.path.join(tmp, 'data')
+        scale_dataset(data_dir, options.factor)
+        results = {}
+        for label, workers in (('sequential', 1),
+                               ('parallel', options.workers)):
+            results[label] = run_import(
+                os.path.join(tmp, f'{label}.sqlite3'), data_dir,
+                workers, options.batch_size
+            )
+            print(f'{label:>10} (workers={workers}): '
+                  f'{results[label]:.2f} с')
+        print(f'ускорение: '
+              f'{results["sequential"] / results["parallel"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
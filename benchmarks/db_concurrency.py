@@ -0,0 +1,236 @@
+"""Конкурентная запись в SQLite: настройки по умолчанию против WAL.
+
+Потоки-воркеры, как синхронные воркеры gunicorn, вызывают WSGI-
+приложение напрямую: каждый поток держит своё соединение, а сигналы
+начала и конца запроса закрывают его по правилам CONN_MAX_AGE. Воркеры
+пишут отзывы и комментарии, создают произведения с жанрами (транзакция
+сначала читает, а потом пишет связи) и читают списки отзывов.
+Сравниваются конфигурации на отдельных файлах базы:
+
+    default      - журнал DELETE, synchronous=FULL, соединение на запрос,
+                   транзакции BEGIN DEFERRED;
+    wal-deferred - SQLITE_PRAGMAS из настроек и постоянные соединения,
+                   но транзакции BEGIN DEFERRED;
+    tuned        - то же с режимом транзакций из настроек (IMMEDIATE).
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.db_concurrency --workers 8 --requests 300
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import disable_throttling, setup_django
+
+# None - значение из настроек проекта
+CONFIGS = {
+    'default': {
+        'pragmas': {}, 'conn_max_age': 0, 'transaction_mode': 'DEFERRED'
+    },
+    'wal-deferred': {
+        'pragmas': None, 'conn_max_age': 600, 'transaction_mode': 'DEFERRED'
+    },
+    'tuned': {'pragmas': None, 'conn_max_age': 600, 'transaction_mode': None},
+}
+TITLES = 500
+GENRES = 10
+
+
+def prepare(db_name, workers):
+    """Новая база: произведения с отзывом автора-затравки, жанры и
+    воркеры-администраторы."""
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from api.authentication import access_token_for
+    from reviews.models import Category, Genre, Review, Title
+
+    call_command('migrate', verbosity=0)
+    User = get_user_model()
+    Category.objects.create(name='Фильмы', slug='movie')
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {index}', slug=f'genre{index}')
+        for index in range(GENRES)
+    )
+    seed = User.objects.create(username='seed', email='seed@yamdb.fake')
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {index}', year=2000, description='')
+        for index in range(TITLES)
+    )
+    Review.objects.bulk_create(
+        Review(title=title, author=seed, text='Отзыв', score=5)
+        for title in Title.objects.all()
+    )
+    reviews = list(Review.objects.values_list('title_id', 'id'))
+    tokens = [
+        str(access_token_for(User.objects.create(
+            username=f'worker{index}', email=f'worker{index}@yamdb.fake',
+            role='admin'
+        )))
+        for index in range(workers)
+    ]
+    return reviews, tokens
+
+
+def call(application, method, path, token, data=None):
+    """Запрос к WSGI-приложению; возвращает статус."""
+    from django.test import RequestFactory
+    request = RequestFactory().generic(
+        method, path, json.dumps(data) if data is not None else '',
+        content_type='application/json',
+        HTTP_AUTHORIZATION=f'Bearer {token}'
+    )
+    status = []
+    response = application(
+        request.environ, lambda code, headers: status.append(code)
+    )
+    for _ in response:
+        pass
+    response.close()
+    return int(status[0].split()[0])
+
+
+def worker(application, index, token, reviews, requests, samples):
+    from django.db import connections
+    rng = random.Random(index)
+    titles = iter(reviews[index::len(samples)])
+    for _ in range(requests):
+        title_id, review_id = rng.choice(reviews)
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        roll = rng.random()
+        started = time.perf_counter()
+        if roll < 0.3:
+            kind, status = 'read', call(application, 'GET', url, token)
+        elif roll < 0.4 and (own := next(titles, None)):
+            kind, status = 'write', call(
+                application, 'POST', f'/api/v1/titles/{own[0]}/reviews/',
+                token, {'text': 'Отзыв воркера', 'score': 7}
+            )
+        elif roll < 0.5:
+            kind, status = 'write', call(
+                application, 'POST', '/api/v1/titles/', token, {
+                    'name': f'Произведение воркера {index}',
+                    'year': 2000,
+                    'description': 'Произведение из нагрузочного теста',
+                    'genre': [
+                        f'genre{number}'
+                        for number in rng.sample(range(GENRES), 2)
+                    ],
+                    'category': 'movie',
+                }
+            )
+        else:
+            kind, status = 'write', call(
+                application, 'POST', f'{url}{review_id}/comments/', token,
+                {'text': 'Комментарий воркера'}
+            )
+        samples[index].append((kind, status, time.perf_counter() - started))
+    connections.close_all()
+
+
+def percentile(values, rank):
+    return values[max(0, int(len(values) * rank / 100 + 0.5) - 1)]
+
+
+def run(config, db_name, workers, requests, pragmas, transaction_mode):
+    """Прогон конфигурации; `pragmas` и `transaction_mode` - значения из
+    настроек проекта."""
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+
+    connections.close_all()
+    database = connections.databases['default']
+    database['NAME'] = db_name
+    database['CONN_MAX_AGE'] = config['conn_max_age']
+    if config['pragmas'] is not None:
+        pragmas = config['pragmas']
+    if config['transaction_mode'] is not None:
+        transaction_mode = config['transaction_mode']
+    database['OPTIONS'] = {
+        **database['OPTIONS'], 'transaction_mode': transaction_mode
+    }
+    settings.SQLITE_PRAGMAS = pragmas
+    reviews, tokens = prepare(db_name, workers)
+    connections.close_all()
+
+    application = get_wsgi_application()
+    samples = [[] for _ in range(workers)]
+    threads = [
+        threading.Thread(target=worker, args=(
+            application, index, tokens[index], reviews, requests, samples
+        ))
+        for index in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    samples = [sample for batch in samples for sample in batch]
+    result = {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, _ in samples if status >= 500),
+        'rps': round(len(samples) / duration, 1),
+    }
+    for kind in ('read', 'write'):
+        latencies = sorted(
+            latency * 1000 for sample_kind, _, latency in samples
+            if sample_kind == kind
+        )
+        result[kind] = {
+            f'p{rank}': round(percentile(latencies, rank), 1)
+            for rank in (50, 95, 99)
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300,
+                        help='Запросов на воркер')
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bootstrap.sqlite3'))
+        from django.conf import settings
+        settings.DEBUG = False
+        disable_throttling()
+        pragmas = dict(settings.SQLITE_PRAGMAS)
+        transaction_mode = settings.DATABASES['default']['OPTIONS'].get(
+            'transaction_mode'
+        )
+        # Ошибки 500 считаются в отчёте, трассировки в консоли не нужны
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        results = {}
+        for name, config in CONFIGS.items():
+            results[name] = run(
+                config, os.path.join(tmp, f'{name}.sqlite3'),
+                options.workers, options.requests, pragmas,
+                transaction_mode
+            )
+            result = results[name]
+            print(
+                f'{name:>12}: {result["rps"]} з/с, ошибок {result["errors"]} '
+                f'из {result["requests"]}, запись p50/p95/p99 '
+                + '/'.join(str(value) for value in result['write'].values())
+                + ' мс, чтение p50/p95/p99 '
+                + '/'.join(str(value) for value in result['read'].values())
+                + ' мс'
+            )
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Генератор синтетического набора данных на основе static/data.
+
+Каждый CSV копируется несколько раз: идентификаторы сдвигаются на
+максимальный id таблицы, уникальные строки получают префикс номера
+копии. Число копий одинаково для всех таблиц (`factor`) или задаётся
+размером таблицы (`sizes`, округляется вверх до целого числа копий).
+
+Копия строки ссылается на копии связанных таблиц по смешанной системе
+счисления: для отзывов номер копии раскладывается на копию произведения
+и копию автора. Поэтому пары (произведение, автор) не повторяются, а
+при нехватке авторов их таблица копируется столько раз, сколько нужно.
+"""
+import argparse
+import csv
+import os
+from math import ceil
+
+from benchmarks.utils import DATA_DIR
+
+# Файл -> (таблица, {колонка внешнего ключа: таблица})
+FILES = {
+    'users.csv': ('users', {}),
+    'category.csv': ('category', {}),
+    'genre.csv': ('genre', {}),
+    'titles.csv': ('titles', {'category_id': 'category'}),
+    'review.csv': ('review', {'title_id': 'titles', 'author_id': 'users'}),
+    'comments.csv': ('comments', {'review_id': 'review',
+                                  'author_id': 'users'}),
+    'genre_title.csv': ('genre_title', {'title_id': 'titles',
+                                        'genre_id': 'genre'}),
+}
+UNIQUE_COLUMNS = ('username', 'email', 'slug')
+# Таблицы, уникальные по паре внешних ключей из FILES
+UNIQUE_TOGETHER = ('review', 'genre_title')
+# Таблица без явного размера копируется вместе с указанной
+FOLLOWS = {'genre_title': 'titles'}
+
+
+def read_source(source_dir):
+    tables = {}
+    for csv_file, (table, _) in FILES.items():
+        with open(os.path.join(source_dir, csv_file), encoding='utf-8',
+                  newline='') as file:
+            reader = csv.DictReader(file)
+            tables[table] = (reader.fieldnames, list(reader))
+    return tables
+
+
+def plan_copies(tables, factor=1, sizes=None):
+    """Число копий каждой таблицы."""
+    sizes = sizes or {}
+    copies = {
+        table: max(1, ceil(sizes[table] / len(rows)))
+        if table in sizes else factor
+        for table, (_, rows) in tables.items()
+    }
+    for table, source in FOLLOWS.items():
+        if table not in sizes:
+            copies[table] = copies[source]
+    foreign_keys = {table: keys for table, keys in FILES.values()}
+    for table in UNIQUE_TOGETHER:
+        first, second = foreign_keys[table].values()
+        copies[second] = max(
+            copies[second], ceil(copies[table] / copies[first])
+        )
+    return copies
+
+
+def scale_dataset(target_dir, factor=100, source_dir=DATA_DIR, sizes=None):
+    """Пишет в `target_dir` увеличенный набор данных.
+
+    `sizes` - желаемое число строк по таблицам ({'titles': 10_000, ...}),
+    таблицы без размера копируются `factor` раз. Возвращает число
+    записанных строк по таблицам.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    tables = read_source(source_dir)
+    max_ids = {
+        table: max(int(row['id']) for row in rows)
+        for table, (_, rows) in tables.items()
+    }
+    copies = plan_copies(tables, factor, sizes)
+    written = {}
+    for csv_file, (table, foreign_keys) in FILES.items():
+        fieldnames, rows = tables[table]
+        with open(os.path.join(target_dir, csv_file), 'w', encoding='utf-8',
+                  newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            for copy in range(copies[table]):
+                offsets = related_offsets(
+                    copy, foreign_keys, copies, max_ids
+                )
+                for row in rows:
+                    writer.writerow(scale_row(
+                        row, copy, max_ids[table], offsets
+                    ))
+        written[table] = copies[table] * len(rows)
+    return written
+
+
+def related_offsets(copy, foreign_keys, copies, max_ids):
+    """Сдвиги внешних ключей копии `copy`: {колонка: сдвиг id}."""
+    offsets = {}
+    for column, related_table in foreign_keys.items():
+        related_copy = copy % copies[related_table]
+        copy //= copies[related_table]
+        offsets[column] = related_copy * max_ids[related_table]
+    return offsets
+
+
+def scale_row(row, copy, max_id, offsets):
+    if not copy and not any(offsets.values()):
+        return row
+    row = dict(row)
+    row['id'] = int(row['id']) + copy * max_id
+    for column, offset in offsets.items():
+        if row[column]:
+            row[column] = int(row[column]) + offset
+    if copy:
+        for column in UNIQUE_COLUMNS:
+            if column in row:
+                row[column] = f'c{copy}{row[column]}'
+    return row
+
+
+def size_arguments(parser):
+    """Параметры размеров таблиц для командной строки."""
+    for table, option in (('titles', '--titles'), ('review', '--reviews'),
+                          ('comments', '--comments'), ('users', '--users')):
+        parser.add_argument(
+            option, type=int, dest=table,
+            help=f'Число строк в таблице {table}'
+        )
+
+
+def sizes_from(options):
+    return {
+        table: getattr(options, table)
+        for table in ('titles', 'review', 'comments', 'users')
+        if getattr(options, table, None)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('target_dir')
+    parser.add_argument(
+        '--factor', type=int,
+        help='Число копий таблиц без явного размера (по умолчанию 100, '
+             'а при заданных размерах - 1)'
+    )
+    size_arguments(parser)
+    options = parser.parse_args()
+    sizes = sizes_from(options)
+    factor = options.factor or (1 if sizes else 100)
+    for table, rows in scale_dataset(
+            options.target_dir, factor, sizes=sizes).items():
+        print(f'{table}: {rows}')
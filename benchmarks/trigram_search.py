@@ -0,0 +1,101 @@
+"""Задержка нечёткого поиска по триграммному индексу названий.
+
+Индекс строится по синтетическим названиям без обращения к базе.
+Запуск из корня репозитория:
+
+    python -m benchmarks.trigram_search --titles 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+from benchmarks.utils import PROJECT_DIR
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+from reviews.trigrams import TrigramIndex  # noqa: E402
+
+CONSONANTS = 'бвгджзклмнпрстфхцчшщ'
+VOWELS = 'аеиоуыэюя'
+VOCABULARY_SIZE = 60_000
+
+
+def make_names(count, rng):
+    """Названия из 1-4 слов; частоты слов распределены по закону Ципфа."""
+    syllables = [
+        pair
+        for consonant in CONSONANTS
+        for vowel in VOWELS
+        for pair in (consonant + vowel, vowel + consonant)
+    ]
+    vocabulary = [
+        ''.join(rng.choices(syllables, k=rng.randint(1, 4)))
+        for _ in range(VOCABULARY_SIZE)
+    ]
+    cum_weights = list(accumulate(
+        1 / rank for rank in range(1, VOCABULARY_SIZE + 1)
+    ))
+    return [
+        ' '.join(rng.choices(
+            vocabulary, cum_weights=cum_weights, k=rng.randint(1, 4)
+        ))
+        for _ in range(count)
+    ]
+
+
+def typo(name, rng):
+    position = rng.randrange(len(name))
+    return name[:position] + name[position + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    names = make_names(options.titles, rng)
+    started = time.perf_counter()
+    index = TrigramIndex.build(enumerate(names, start=1))
+    build_time = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trigram_index.bin')
+        index.dump(path)
+        size = os.path.getsize(path)
+        started = time.perf_counter()
+        index = TrigramIndex.load(path)
+        load_time = time.perf_counter() - started
+
+    timings = []
+    found = 0
+    for _ in range(options.queries):
+        title_id = rng.randrange(len(names))
+        query = typo(names[title_id], rng)
+        started = time.perf_counter()
+        results = index.search(query, limit=5)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += any(
+            names[result_id - 1] == names[title_id]
+            for result_id, _ in results
+        )
+    timings.sort()
+    print(f'названий: {options.titles}')
+    print(f'построение: {build_time:.1f} с, загрузка из файла: '
+          f'{load_time:.2f} с, размер файла: {size / 2 ** 20:.1f} МБ')
+    print(f'поиск, мс: p50 {statistics.median(timings):.2f}, '
+          f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f}, '
+          f'max {timings[-1]:.2f}')
+    print(f'исходное название в первых пяти: '
+          f'{found / options.queries:.0%}')
+
+
+if __name__ == '__main__':
+    main()
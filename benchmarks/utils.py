@@ -0,0 +1,31 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = ROOT_DIR / 'api_yamdb'
+DATA_DIR = PROJECT_DIR / 'static' / 'data'
+
+
+def setup_django(db_name=None):
+    """Настраивает Django для запуска бенчмарка вне manage.py.
+
+    Если передан `db_name`, подключение `default` направляется в этот
+    файл SQLite, чтобы не трогать рабочую базу.
+    """
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    from django.conf import settings
+    if db_name is not None:
+        settings.DATABASES['default']['NAME'] = str(db_name)
+    django.setup()
+
+
+def disable_throttling():
+    """Снимает ограничения частоты: нагрузку дают немногие пользователи."""
+    from rest_framework.settings import api_settings
+    rates = api_settings.DEFAULT_THROTTLE_RATES
+    for scope in rates:
+        rates[scope] = None
@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +34,41 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def mail_queue_eager(settings):
+    """Письма уходят сразу, чтобы их было видно в `mail.outbox`."""
+    settings.MAIL_QUEUE_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def trigram_index(settings, tmp_path):
+    from reviews.trigrams import reset_index
+    settings.TRIGRAM_INDEX_PATH = tmp_path / 'trigram_index.bin'
+    reset_index()
+    yield
+    reset_index()
+
+
+@pytest.fixture(autouse=True)
+def throttle_store(settings, tmp_path):
+    settings.THROTTLE_STORE_PATH = tmp_path / 'throttle.bin'
+    settings.THROTTLE_STORE_SLOTS = 64
+
+
+@pytest.fixture(autouse=True)
+def query_inspection(settings):
+    """Запрос к API с повторяющимися SQL-запросами завершается ошибкой.
+
+    Порог ниже, чем по умолчанию: в тестах списки короткие.
+    """
+    settings.QUERY_INSPECTION = 'raise'
+    settings.QUERY_REPEAT_LIMIT = 3
+    settings.SLOW_QUERY_THRESHOLD = 5
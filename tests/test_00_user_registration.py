@@ -1,4 +1,6 @@
 from http import HTTPStatus
+from io import StringIO
+from smtplib import SMTPException
 
 import pytest
 from django.core import mail
@@ -373,3 +375,88 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_signup_mail_queue(self, client, settings, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.core.management import call_command
+
+        from users.models import OutgoingEmail
+
+        settings.MAIL_QUEUE_EAGER = False
+        opened = []
+        original_open = EmailBackend.open
+
+        def count_open(backend):
+            opened.append(backend)
+            return original_open(backend)
+        monkeypatch.setattr(EmailBackend, 'open', count_open)
+
+        outbox_before_count = len(mail.outbox)
+        for number in range(3):
+            client.post(self.url_signup, data={
+                'email': f'queued{number}@yamdb.fake',
+                'username': f'queued{number}'
+            })
+        assert len(mail.outbox) == outbox_before_count, (
+            f'Проверьте, что POST-запрос к `{self.url_signup}` только ставит '
+            'письмо в очередь, а не отправляет его.'
+        )
+        assert OutgoingEmail.objects.filter(sent=None).count() == 3, (
+            f'Проверьте, что POST-запрос к `{self.url_signup}` сохраняет '
+            'письмо в очередь.'
+        )
+
+        call_command('send-queued-mail', stdout=StringIO())
+        assert len(mail.outbox) == outbox_before_count + 3, (
+            'Проверьте, что команда `send-queued-mail` отправляет письма '
+            'из очереди.'
+        )
+        assert len(opened) == 1, (
+            'Проверьте, что пачка писем отправляется через одно соединение.'
+        )
+        assert not OutgoingEmail.objects.filter(sent=None).exists(), (
+            'Проверьте, что отправленные письма отмечаются в очереди.'
+        )
+
+    def test_signup_mail_queue_retry(self, client, settings, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        from users.models import OutgoingEmail
+
+        settings.MAIL_QUEUE_EAGER = False
+        settings.MAIL_QUEUE_MAX_ATTEMPTS = 2
+
+        def fail(backend, messages):
+            raise SMTPException('Сервер недоступен')
+        monkeypatch.setattr(EmailBackend, 'send_messages', fail)
+        client.post(self.url_signup, data={
+            'email': 'retry@yamdb.fake',
+            'username': 'retry'
+        })
+
+        call_command('send-queued-mail', stdout=StringIO())
+        email = OutgoingEmail.objects.get()
+        assert email.sent is None and email.attempts == 1, (
+            'Проверьте, что неотправленное письмо остаётся в очереди.'
+        )
+        assert email.next_attempt > timezone.now(), (
+            'Проверьте, что повторная отправка откладывается.'
+        )
+        call_command('send-queued-mail', stdout=StringIO())
+        assert OutgoingEmail.objects.get().attempts == 1, (
+            'Проверьте, что письмо не отправляется повторно до истечения '
+            'паузы.'
+        )
+
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        call_command('send-queued-mail', stdout=StringIO())
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 2 and email.next_attempt is None, (
+            'Проверьте, что после MAIL_QUEUE_MAX_ATTEMPTS попыток письмо '
+            'больше не отправляется.'
+        )
+        assert 'Сервер недоступен' in email.last_error, (
+            'Проверьте, что в очереди сохраняется последняя ошибка отправки.'
+        )
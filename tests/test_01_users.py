@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
+from api.authentication import access_token_for
 from tests.utils import (check_pagination,
                          invalid_data_for_user_patch_and_creation)
 
@@ -552,3 +556,85 @@ class Test01UserAPI:
             'Проверьте, что PATCH-запрос к `/api/v1/users/me/` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_01_token_claims_without_user_query(self, admin):
+        client = APIClient()
+        token = access_token_for(admin)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        client.get('/api/v1/users/')
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.delete('/api/v1/categories/missing/')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что токен с ролью в claims принимается.'
+        )
+        user_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'users_user' in query['sql']
+        ]
+        assert not user_queries, (
+            'Проверьте, что для проверки прав по токену с ролью '
+            f'пользователь не загружается из базы: {user_queries}'
+        )
+
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['email'] == admin.email, (
+            'Проверьте, что поля пользователя, которых нет в токене, '
+            'загружаются из базы при обращении к ним.'
+        )
+
+    def test_11_02_role_change_revokes_token(self, admin_client, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}'
+        )
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что токен с ролью в claims принимается.'
+        )
+
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что после изменения роли пользователя через '
+            '`/api/v1/users/{username}/` выданный ранее токен отзывается.'
+        )
+
+        user.refresh_from_db()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}'
+        )
+        response = client.get('/api/v1/users/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новый токен содержит новую роль пользователя.'
+        )
+
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        response = client.get('/api/v1/users/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удалённого пользователя не принимается.'
+        )
+
+    def test_11_03_role_change_with_update_fields(self, user):
+        from users.models import User
+        from users.tokens import get_cache, version_key
+        version = user.token_version
+        user.role = 'admin'
+        user.save(update_fields=['role'])
+        stored = User.objects.get(pk=user.pk).token_version
+        assert stored == version + 1, (
+            'Проверьте, что при save(update_fields=[...]) без '
+            '`token_version` новая версия токенов записывается в базу.'
+        )
+        assert get_cache().get(version_key(user.pk)) == stored, (
+            'Проверьте, что в кэш попадает версия токенов из базы.'
+        )
+        user.bio = 'Новое описание'
+        user.role = 'user'
+        user.save(update_fields=['bio'])
+        assert User.objects.get(pk=user.pk).token_version == stored, (
+            'Проверьте, что поля токена, которые не сохраняются, не '
+            'отзывают токены.'
+        )
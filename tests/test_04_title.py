@@ -1,9 +1,13 @@
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (check_pagination, check_permissions,
-                         create_categories, create_genre, create_titles)
+                         create_categories, create_genre,
+                         create_single_review, create_titles)
 
 
 @pytest.mark.django_db(transaction=True)
@@ -316,3 +320,396 @@ class Test04TitleAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, url, data, 'модератора',
                           titles, HTTPStatus.FORBIDDEN)
+
+    def test_06_titles_list_query_count(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        with CaptureQueriesContext(connection) as small_page:
+            response = client.get(url)
+        assert len(response.json()['results']) == len(titles)
+
+        for idx in range(5):
+            admin_client.post(url, data={
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % 2]['slug'],
+                'description': 'Описание'
+            })
+        with CaptureQueriesContext(connection) as full_page:
+            response = client.get(url)
+        assert len(response.json()['results']) == 5
+
+        assert len(small_page) == len(full_page) == 3, (
+            f'Проверьте, что GET-запрос к `{url}` выполняет фиксированное '
+            'число запросов к базе данных независимо от количества '
+            'произведений на странице: категории должны загружаться '
+            'JOIN\'ом, а жанры - одним запросом.'
+        )
+
+        with CaptureQueriesContext(connection) as detail:
+            client.get(f'{url}{titles[0]["id"]}/')
+        assert len(detail) == 2, (
+            f'Проверьте, что GET-запрос к `{url}{{title_id}}/` загружает '
+            'категорию и жанры произведения без лишних запросов.'
+        )
+
+    def test_07_titles_response_cache(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+
+        client.get(url)
+        with CaptureQueriesContext(connection) as cached:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(cached) == 0, (
+            f'Проверьте, что повторный GET-запрос к `{url}` отдаётся из кэша '
+            'без обращения к базе данных.'
+        )
+
+        admin_client.patch(url, data={'name': 'Терминатор 2'})
+        response = client.get(url)
+        assert response.json()['name'] == 'Терминатор 2', (
+            f'Проверьте, что кэш `{url}` сбрасывается при изменении '
+            'произведения.'
+        )
+
+        create_single_review(admin_client, titles[0]['id'], 'Отлично', 9)
+        response = client.get(url)
+        assert response.json()['rating'] == 9, (
+            f'Проверьте, что кэш `{url}` сбрасывается при изменении '
+            'рейтинга произведения.'
+        )
+
+    @pytest.mark.parametrize('query', (
+        'category=films',
+        'category_prefix=fi',
+        'genre=horror,drama',
+        'genre_prefix=dr',
+        'year=1984',
+        'year_prefix=19',
+        'year_min=1980&year_max=1990',
+    ))
+    def test_08_titles_filters_use_indexes(self, client, admin_client, query):
+        if connection.vendor != 'sqlite':
+            pytest.skip('План запроса проверяется только для SQLite.')
+        create_titles(admin_client)
+        url = f'/api/v1/titles/?{query}'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] > 0, (
+            f'Проверьте, что фильтр `{query}` находит произведения.'
+        )
+        for captured in context.captured_queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + captured['sql'])
+                plan = [row[-1] for row in cursor.fetchall()]
+            full_scans = [
+                step for step in plan
+                if step.startswith('SCAN') and step != 'SCAN subquery'
+            ]
+            assert not full_scans, (
+                f'Проверьте, что фильтрация `{url}` использует индексы. '
+                f'Полный просмотр таблиц: {full_scans}'
+            )
+
+    def test_09_titles_filters_legacy_match(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        response = client.get(f'{url}?genre=rror')
+        assert response.json()['count'] == 0, (
+            f'Проверьте, что фильтр `genre` для `{url}` сравнивает slug '
+            'жанра точно.'
+        )
+        response = client.get(f'{url}?genre=rror&match=legacy')
+        assert response.json()['count'] == 1, (
+            f'Проверьте, что для `{url}` параметр `match=legacy` включает '
+            'поиск вхождения подстроки.'
+        )
+        response = client.get(f'{url}?genre=horror,comedy')
+        assert response.json()['count'] == 1, (
+            f'Проверьте, что фильтр `genre` для `{url}` принимает несколько '
+            'slug через запятую и не дублирует произведения.'
+        )
+
+    def test_10_titles_fuzzy_name(self, client, admin_client):
+        url = '/api/v1/titles/'
+        response = client.get(f'{url}?name=терминатр&match=fuzzy')
+        assert response.json()['count'] == 0, (
+            f'Проверьте, что нечёткий поиск `{url}` работает на пустой базе.'
+        )
+        titles, _, _ = create_titles(admin_client)
+        admin_client.post(url, data={
+            'name': 'Терминатор 2',
+            'year': 1991,
+            'genre': titles[0]['genre'],
+            'category': titles[0]['category'],
+            'description': 'Судный день',
+        })
+
+        response = client.get(f'{url}?name=терминатр&match=fuzzy')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Терминатор', 'Терминатор 2'], (
+            f'Проверьте, что `{url}?match=fuzzy` находит названия с '
+            'опечатками, в том числе только что созданные, и сортирует их '
+            'по сходству.'
+        )
+
+        admin_client.patch(
+            f'{url}{titles[0]["id"]}/', data={'name': 'Чужой'}
+        )
+        admin_client.delete(f'{url}{titles[1]["id"]}/')
+        response = client.get(f'{url}?name=терминатр&match=fuzzy')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Терминатор 2'], (
+            f'Проверьте, что нечёткий поиск `{url}` учитывает переименование '
+            'произведений.'
+        )
+        response = client.get(f'{url}?name=чужй&match=fuzzy')
+        assert response.json()['count'] == 1, (
+            f'Проверьте, что нечёткий поиск `{url}` находит новое название '
+            'после переименования.'
+        )
+
+    def test_11_titles_trigram_index_file(self, admin_client):
+        from django.core.management import call_command
+
+        from reviews.trigrams import get_index, reset_index
+
+        titles, _, _ = create_titles(admin_client)
+        call_command('build-trigram-index', stdout=StringIO())
+        reset_index()
+        with CaptureQueriesContext(connection) as context:
+            results = get_index().search('крепкй орешик')
+        assert not context.captured_queries, (
+            'Проверьте, что сохранённый триграммный индекс загружается из '
+            'файла без запросов к базе.'
+        )
+        assert [title_id for title_id, _ in results] == [titles[1]['id']], (
+            'Проверьте, что индекс, загруженный из файла, находит названия '
+            'с опечатками.'
+        )
+
+    def test_12_titles_bulk(self, admin_client, user_client):
+        _, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/bulk/'
+
+        def item(number, **kwargs):
+            data = {
+                'name': f'Произведение {number}',
+                'year': 2000 + number,
+                'genre': [genres[0]['slug'], genres[1]['slug']],
+                'category': categories[0]['slug'],
+                'description': 'Описание',
+            }
+            data.update(kwargs)
+            return data
+
+        response = user_client.post(url, data=[item(1)], format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+
+        items = [item(number) for number in range(20)]
+        items[3] = item(3, genre=['missing-genre'])
+        items[7] = item(7, category='missing-category')
+        del items[11]['year']
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data=items, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос администратора к `{url}` с '
+            'корректными элементами возвращает ответ со статусом 201.'
+        )
+        data = response.json()
+        assert [error['index'] for error in data['errors']] == [3, 7, 11], (
+            f'Проверьте, что `{url}` возвращает ошибки по каждому '
+            'некорректному элементу с его индексом.'
+        )
+        assert 'genre' in data['errors'][0]['errors'], (
+            f'Проверьте, что `{url}` сообщает о несуществующем жанре.'
+        )
+        assert len(data['created']) == 17, (
+            f'Проверьте, что `{url}` создаёт все корректные элементы.'
+        )
+        assert len(context.captured_queries) < 20, (
+            f'Проверьте, что `{url}` разрешает slug и записывает '
+            'произведения пачками, а не отдельным запросом на каждое.'
+        )
+
+        created = dict(
+            (entry['index'], entry['id']) for entry in data['created']
+        )
+        response = admin_client.get(f'/api/v1/titles/{created[5]}/')
+        title = response.json()
+        assert title['name'] == 'Произведение 5', (
+            f'Проверьте, что `{url}` возвращает id созданных произведений.'
+        )
+        assert {genre['slug'] for genre in title['genre']} == {
+            genres[0]['slug'], genres[1]['slug']
+        }, f'Проверьте, что `{url}` связывает произведения с жанрами.'
+        response = admin_client.get('/api/v1/titles/')
+        assert response.json()['count'] == 19, (
+            f'Проверьте, что после `{url}` список произведений обновляется.'
+        )
+        response = admin_client.get('/api/v1/titles/?search=произведение')
+        assert response.json()['count'] == 17, (
+            f'Проверьте, что произведения, созданные через `{url}`, попадают '
+            'в поисковый индекс.'
+        )
+
+    def test_13_titles_sparse_fields(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'{url}?fields=id,name,rating')
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert all(
+            set(title) == {'id', 'name', 'rating'} for title in results
+        ), f'Проверьте, что `{url}?fields=` возвращает только указанные поля.'
+        title_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'reviews_title' in query['sql']
+        ]
+        assert len(context) == 2 and not any(
+            'description' in sql or 'reviews_genre' in sql
+            or 'reviews_category' in sql for sql in title_queries
+        ), (
+            f'Проверьте, что `{url}?fields=` читает из базы только нужные '
+            'колонки и не загружает жанры и категории.'
+        )
+
+        response = client.get(
+            f'{url}{titles[0]["id"]}/?fields=name,genre,category&expand='
+        )
+        title = response.json()
+        assert title == {
+            'name': titles[0]['name'],
+            'genre': titles[0]['genre'],
+            'category': titles[0]['category'],
+        }, (
+            'Проверьте, что пустой `expand` возвращает жанры и категорию '
+            'в виде slug.'
+        )
+
+        response = client.get(f'{url}?fields=id,unknown&expand=reviews')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что `{url}` отклоняет неизвестные поля в `fields` '
+            'и `expand`.'
+        )
+        assert set(response.json()) == {'fields', 'expand'}
+
+    def test_14_titles_cache_reset_on_commit(self, admin_client):
+        from django.db import transaction
+        from api.cache import catalogue_version
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        version = catalogue_version()
+        with transaction.atomic():
+            Title.objects.get(id=titles[0]['id']).save()
+            assert catalogue_version() == version, (
+                'Проверьте, что кэш каталога сбрасывается после фиксации '
+                'транзакции, а не внутри неё.'
+            )
+        assert catalogue_version() != version, (
+            'Проверьте, что кэш каталога сбрасывается при изменении '
+            'произведения.'
+        )
+
+    def test_15_trigram_index_large_ids(self, tmp_path):
+        from reviews.trigrams import TrigramIndex
+        large_id = 2 ** 40
+        index = TrigramIndex.build([
+            (large_id, 'Терминатор'), (5, 'Чужой'), (large_id + 1, 'Хищник')
+        ])
+        index.add(7, 'Терминатор 2')
+        assert len(index.ids) == 4, (
+            'Проверьте, что размер триграммного индекса зависит от числа '
+            'произведений, а не от наибольшего id.'
+        )
+        path = tmp_path / 'index.bin'
+        index.dump(path)
+        index = TrigramIndex.load(path)
+        assert [title_id for title_id, _ in index.search('терминатр')] == [
+            large_id, 7
+        ], (
+            'Проверьте, что триграммный индекс находит произведения с '
+            'большими id и id, добавленными не по возрастанию.'
+        )
+        index.remove(large_id, 'Терминатор')
+        index.add(6, 'Чужой 2')
+        assert [title_id for title_id, _ in index.search('чужй')] == [5, 6]
+        assert [title_id for title_id, _ in index.search('терминатр')] == [
+            7
+        ], 'Проверьте удаление из триграммного индекса.'
+
+    def test_16_trigram_index_reloaded_after_rebuild(self, settings):
+        import os
+
+        from reviews.trigrams import TrigramIndex, get_index
+        path = settings.TRIGRAM_INDEX_PATH
+        TrigramIndex.build([(1, 'Терминатор')]).dump(path)
+        assert [title_id for title_id, _ in get_index().search(
+            'терминатр'
+        )] == [1]
+        TrigramIndex.build([(2, 'Терминатор 2')]).dump(path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert [title_id for title_id, _ in get_index().search(
+            'терминатр'
+        )] == [2], (
+            'Проверьте, что воркер перечитывает триграммный индекс после '
+            'пересборки файла.'
+        )
+
+    def test_17_titles_fields(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        expected = {
+            'id', 'name', 'year', 'description', 'genre', 'category', 'rating'
+        }
+        responses = {
+            'списка': client.get(url).json()['results'][0],
+            'одного произведения': client.get(
+                f'{url}{titles[0]["id"]}/'
+            ).json(),
+        }
+        assert all(
+            set(data) == expected for data in responses.values()
+        ), (
+            f'Проверьте, что ответ `{url}` содержит ровно поля {expected}: '
+            f'{ {name: set(data) for name, data in responses.items()} }'
+        )
+        response = admin_client.patch(
+            f'{url}{titles[0]["id"]}/', data={'name': 'Новое название'}
+        )
+        assert set(response.json()) == expected - {'rating'}, (
+            f'Проверьте, что ответ на изменение произведения `{url}` не '
+            'содержит служебных полей.'
+        )
+
+    @pytest.mark.parametrize('prefix,years', (
+        ('12345', []),
+        ('012', []),
+        ('0', [0]),
+        ('12', [12, 120]),
+        ('1', [12, 120, 1984]),
+    ))
+    def test_18_titles_year_prefix(self, client, prefix, years):
+        from reviews.models import Title
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {year}', year=year, description='')
+            for year in (0, 5, 12, 120, 1984)
+        )
+        url = f'/api/v1/titles/?year_prefix={prefix}'
+        response = client.get(url)
+        assert sorted(
+            title['year'] for title in response.json()['results']
+        ) == years, (
+            f'Проверьте, что `{url}` находит только годы, запись которых '
+            'начинается с префикса: без ведущих нулей и не длиннее года.'
+        )
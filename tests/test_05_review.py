@@ -1,7 +1,10 @@
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
 from django.db.utils import IntegrityError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from tests.utils import (check_fields, check_pagination, create_reviews,
                          create_single_review, create_titles)
@@ -384,3 +387,229 @@ class Test05ReviewAPI:
                 f'Проверьте, что DELETE-запрос {role} к чужому отзыву через '
                 f'`{url_template}` удаляет отзыв.'
             )
+
+    def test_06_review_rating_is_kept_in_sync(self, admin_client, admin,
+                                              user_client, user,
+                                              moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        review_url = title_url + 'reviews/{review_id}/'
+
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 5, (
+            'Проверьте, что рейтинг произведения равен средней оценке '
+            'оставленных отзывов.'
+        )
+
+        user_client.patch(
+            review_url.format(review_id=reviews[1]['id']), data={'score': 8}
+        )
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 6, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'изменении оценки в отзыве.'
+        )
+
+        moderator_client.delete(review_url.format(review_id=reviews[2]['id']))
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 6, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'удалении отзыва.'
+        )
+
+        user.delete()
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 5, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'каскадном удалении отзывов вместе с автором.'
+        )
+
+        admin.reviews.all().delete()
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') is None, (
+            'Если отзывов о произведении не осталось - значением поля '
+            '`rating` должно быть `None`.'
+        )
+
+    def test_07_review_conditional_get(self, client, admin_client, admin,
+                                       user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит заголовки '
+            '`ETag` и `Last-Modified`.'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным `ETag` '
+            'возвращает ответ со статусом 304.'
+        )
+
+        user_client.patch(f'{url}{reviews[1]["id"]}/', data={'text': 'Новый'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после изменения отзыва GET-запрос к `{url}` '
+            'со старым `ETag` возвращает ответ со статусом 200.'
+        )
+
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        response = client.get(comments_url)
+        comments_etag = response.get('ETag')
+        admin_client.post(comments_url, data={'text': 'Комментарий'})
+        response = client.get(comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после добавления комментария GET-запрос к '
+            f'`{comments_url}` со старым `ETag` возвращает ответ со '
+            'статусом 200.'
+        )
+
+    def test_08_review_sparse_fields(self, client, admin_client, admin,
+                                     user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(f'{url}?fields=id,score,author&expand=author')
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert all(set(review) == {'id', 'score', 'author'}
+                   for review in results), (
+            f'Проверьте, что `{url}?fields=` возвращает только указанные поля.'
+        )
+        assert {review['author']['username'] for review in results} == {
+            admin.username, user.username
+        } and set(results[0]['author']) == {
+            'username', 'first_name', 'last_name', 'bio'
+        }, (
+            f'Проверьте, что `{url}?expand=author` возвращает автора '
+            'вложенным объектом.'
+        )
+
+        response = client.get(f'{url}?fields=text&pagination=cursor')
+        assert response.json()['results'] == [
+            {'text': review['text']} for review in reviews
+        ], f'Проверьте, что `{url}?fields=` работает с курсорной пагинацией.'
+
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        admin_client.post(comments_url, data={'text': 'Комментарий'})
+        response = client.get(f'{comments_url}?fields=text,author')
+        assert response.json()['results'] == [
+            {'text': 'Комментарий', 'author': admin.username}
+        ], (
+            f'Проверьте, что `{comments_url}?fields=` возвращает только '
+            'указанные поля.'
+        )
+
+    def test_09_review_cursor_pagination(self, client, admin_client, admin,
+                                         user_client, user,
+                                         django_user_model):
+        def author_client(username):
+            author = django_user_model.objects.create_user(
+                username=username, email=f'{username}@yamdb.fake'
+            )
+            api_client = APIClient()
+            api_client.credentials(
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(author)}'
+            )
+            return author, api_client
+
+        author_map = {admin: admin_client, user: user_client}
+        author_map.update(author_client(f'Author{idx}') for idx in range(6))
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(f'{url}?pagination=cursor')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data and data['previous'] is None, (
+            f'Проверьте, что курсорная пагинация для `{url}` не выполняет '
+            'подсчёт всех объектов.'
+        )
+        assert data['next'], (
+            f'Проверьте, что курсорная пагинация для `{url}` возвращает '
+            'ссылку на следующую страницу.'
+        )
+        received = [review['id'] for review in data['results']]
+
+        _, late_client = author_client('LateAuthor')
+        response = create_single_review(
+            late_client, titles[0]['id'], 'late review', 7
+        )
+        reviews.append({'id': response.json()['id']})
+
+        response = client.get(data['next'])
+        data = response.json()
+        received.extend(review['id'] for review in data['results'])
+        assert data['next'] is None and data['previous']
+        assert received == [review['id'] for review in reviews], (
+            f'Проверьте, что курсорная пагинация для `{url}` возвращает '
+            'все отзывы в порядке публикации без повторов и пропусков, даже '
+            'если между запросами страниц добавлен новый отзыв.'
+        )
+
+        response = client.get(data['previous'])
+        data = response.json()
+        assert [review['id'] for review in data['results']] == received[:5], (
+            f'Проверьте, что ссылка на предыдущую страницу `{url}` '
+            'возвращает те же отзывы, что и первая страница.'
+        )
+        assert data['previous'] is None
+
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_10_review_conditional_get_after_rebuild(self, client,
+                                                     admin_client, admin):
+        from django.core.management import call_command
+        from reviews.models import Title
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        Title.objects.update(reviews_modified=None)
+        etag = client.get(url).get('ETag')
+
+        call_command('rebuild-ratings', stdout=StringIO())
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после пересчёта рейтинга (например, после '
+            f'загрузки CSV) GET-запрос к `{url}` со старым `ETag` '
+            'возвращает ответ со статусом 200.'
+        )
+        assert response.get('Last-Modified'), (
+            'Проверьте, что после пересчёта рейтинга у произведения есть '
+            'время изменения отзывов.'
+        )
+
+    def test_11_review_conditional_get_after_author_rename(
+            self, client, admin_client, admin, user_client, user):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        user_client.post(comments_url, data={'text': 'Комментарий'})
+        etags = {
+            address: client.get(address).get('ETag')
+            for address in (url, comments_url)
+        }
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        for address, etag in etags.items():
+            response = client.get(address, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что после переименования автора GET-запрос к '
+                f'`{address}` со старым `ETag` возвращает ответ со статусом '
+                '200.'
+            )
+            assert 'renamed' in {
+                item['author'] for item in response.json()['results']
+            }
@@ -381,3 +381,64 @@ class Test06CommentAPI:
             'Проверьте, что DELETE-запрос неавторизованного пользователя к '
             f'`{url}` возвращает ответ со статусом 401.'
         )
+
+    def test_07_comment_cursor_pagination(self, client, admin_client, admin,
+                                          user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/comments/'
+        )
+        for idx in range(5):
+            response = create_single_comment(
+                user_client, titles[0]['id'], reviews[0]['id'],
+                f'extra comment {idx}'
+            )
+            comments.append({'id': response.json()['id']})
+
+        response = client.get(f'{url}?pagination=cursor')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data and data['previous'] is None, (
+            f'Проверьте, что курсорная пагинация для `{url}` не выполняет '
+            'подсчёт всех объектов.'
+        )
+        received = [comment['id'] for comment in data['results']]
+        assert data['next'], (
+            f'Проверьте, что курсорная пагинация для `{url}` возвращает '
+            'ссылку на следующую страницу.'
+        )
+        response = client.get(data['next'])
+        data = response.json()
+        received.extend(comment['id'] for comment in data['results'])
+        assert data['next'] is None and data['previous']
+        assert received == [comment['id'] for comment in comments], (
+            f'Проверьте, что курсорная пагинация для `{url}` возвращает '
+            'все комментарии в порядке публикации без повторов.'
+        )
+
+        response = client.get(data['previous'])
+        data = response.json()
+        assert [comment['id'] for comment in data['results']] == received[:5]
+        assert data['previous'] is None
+
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_08_comment_review_from_other_title(self, admin_client, admin,
+                                                user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        url = (
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/comments/'
+        )
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что запрос к комментариям отзыва, который не '
+            'относится к произведению из URL, возвращает ответ со статусом '
+            '404.'
+        )
+        response = user_client.post(url, data={'text': 'Не туда'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08SearchAPI:
+    url = '/api/v1/search/'
+
+    def test_01_search_not_auth(self, client, admin_client, admin,
+                                user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        comments, reviews, titles = create_comments(admin_client, author_map)
+
+        response = client.get(self.url)
+        assert response.status_code != HTTPStatus.NOT_FOUND, (
+            f'Эндпоинт `{self.url}` не найден, проверьте настройки в '
+            '*urls.py*.'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что GET-запрос к `{self.url}` без параметра '
+            '`search` возвращает ответ со статусом 400.'
+        )
+
+        response = client.get(self.url, {'search': 'терминатор'})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос неавторизованного пользователя к '
+            f'`{self.url}` возвращает ответ со статусом 200.'
+        )
+        results = response.json()['results']
+        assert results and results[0]['type'] == 'title', (
+            f'Проверьте, что `{self.url}` находит произведение по названию '
+            'без учёта регистра.'
+        )
+        assert results[0]['id'] == titles[0]['id']
+        assert '<b>' in results[0]['snippet'], (
+            f'Проверьте, что результаты `{self.url}` содержат фрагмент '
+            'текста с подсветкой найденных слов.'
+        )
+
+        response = client.get(
+            self.url, {'search': 'comment number', 'type': 'comment'}
+        )
+        results = response.json()['results']
+        assert {result['id'] for result in results} == {
+            comment['id'] for comment in comments
+        }, (
+            f'Проверьте, что `{self.url}` ищет по комментариям и '
+            'фильтрует результаты по параметру `type`.'
+        )
+        assert all(result['review_id'] == reviews[0]['id']
+                   for result in results)
+
+    def test_02_titles_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        response = client.get(url, {'search': 'орешек'})
+        data = response.json()
+        assert [title['id'] for title in data['results']] == [
+            titles[1]['id']
+        ], (
+            f'Проверьте, что для `{url}` параметр `search` ищет произведения '
+            'по названию.'
+        )
+        response = client.get(url, {'search': 'back'})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ], (
+            f'Проверьте, что для `{url}` параметр `search` ищет произведения '
+            'по описанию.'
+        )
+
+        admin_client.delete(f'{url}{titles[1]["id"]}/')
+        response = client.get(self.url, {'search': 'орешек'})
+        assert response.json()['results'] == [], (
+            'Проверьте, что удалённое произведение пропадает из поиска.'
+        )
+
+    def test_03_snippet_escaped(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        text = 'Отличный <script>alert("xss")</script> фильм & <i>сюжет</i>'
+        admin_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            data={'text': text, 'score': 8}
+        )
+        response = client.get(
+            self.url, {'search': 'отличный', 'type': 'review'}
+        )
+        snippet = response.json()['results'][0]['snippet']
+        assert '<script>' not in snippet and '<i>' not in snippet, (
+            f'Проверьте, что `{self.url}` экранирует HTML из текста '
+            'пользователя во фрагменте.'
+        )
+        assert snippet == (
+            '<b>Отличный</b> &lt;script&gt;alert(&quot;xss&quot;)'
+            '&lt;/script&gt; фильм &amp; &lt;i&gt;сюжет&lt;/i&gt;'
+        ), (
+            f'Проверьте, что `{self.url}` подсвечивает найденные слова '
+            'тегом <b> в экранированном тексте.'
+        )
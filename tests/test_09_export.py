@@ -0,0 +1,100 @@
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import create_comments
+
+
+def snapshot():
+    """Данные всех наборов выгрузки."""
+    from api.export import DATASETS
+    return {
+        name: list(dataset.rows()) for name, dataset in DATASETS.items()
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09ExportAPI:
+    url = '/api/v1/export/'
+
+    def test_01_export_permissions(self, client, user_client, admin_client):
+        url = f'{self.url}titles/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что `{url}` недоступен анонимному пользователю.'
+        )
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` недоступен пользователю с ролью `user`.'
+        )
+        response = admin_client.get(f'{self.url}missing/')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что `{self.url}` возвращает 404 для неизвестного '
+            'набора данных.'
+        )
+
+    def test_02_export_formats(self, admin_client, admin, user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        comments, reviews, titles = create_comments(admin_client, author_map)
+
+        response = admin_client.get(f'{self.url}titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            f'Проверьте, что `{self.url}` отдаёт данные потоком.'
+        )
+        records = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        assert [record['id'] for record in records] == [
+            title['id'] for title in titles
+        ], f'Проверьте, что `{self.url}titles/` выгружает все произведения.'
+        assert records[0]['genre'] == sorted(titles[0]['genre']), (
+            'Проверьте, что в NDJSON-выгрузке произведений есть жанры.'
+        )
+        assert records[0]['category'] == titles[0]['category'], (
+            'Проверьте, что в NDJSON-выгрузке произведений есть категория.'
+        )
+        assert 'rating' in records[0], (
+            'Проверьте, что в NDJSON-выгрузке произведений есть рейтинг.'
+        )
+
+        response = admin_client.get(f'{self.url}comments/', {'format': 'csv'})
+        assert response['Content-Type'].startswith('text/csv'), (
+            f'Проверьте, что `{self.url}` поддерживает `format=csv`.'
+        )
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        assert [int(row['id']) for row in rows] == [
+            comment['id'] for comment in comments
+        ], f'Проверьте, что `{self.url}comments/` выгружает комментарии.'
+        assert set(rows[0]) == {
+            'id', 'review_id', 'text', 'author_id', 'pub_date'
+        }, 'Проверьте, что колонки CSV совпадают с полями модели.'
+
+    def test_03_export_round_trip(self, admin_client, admin, user_client,
+                                  user, tmp_path):
+        from django.contrib.auth import get_user_model
+
+        from reviews.models import Category, Genre, Title
+
+        author_map = {admin: admin_client, user: user_client}
+        create_comments(admin_client, author_map)
+        Title.objects.create(name='Без категории', year=2000, description='')
+        expected = snapshot()
+
+        call_command('export-data', path=str(tmp_path), stdout=StringIO())
+        Title.objects.all().delete()
+        Genre.objects.all().delete()
+        Category.objects.all().delete()
+        get_user_model().objects.all().delete()
+        call_command('csv-in-bd', path=str(tmp_path), stdout=StringIO())
+
+        assert snapshot() == expected, (
+            'Проверьте, что CSV-выгрузка `export-data` загружается обратно '
+            'командой `csv-in-bd` без изменений.'
+        )
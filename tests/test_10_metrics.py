@@ -0,0 +1,141 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_reviews, create_titles
+
+
+@pytest.fixture
+def metrics_registry():
+    from api.metrics import registry
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10Metrics:
+    url = '/api/v1/_metrics'
+
+    def test_01_server_timing(self, admin_client, metrics_registry):
+        create_titles(admin_client)
+        response = admin_client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        timing = response.get('Server-Timing', '')
+        for metric in ('db;dur=', 'serializer;dur=', 'total;dur='):
+            assert metric in timing, (
+                'Проверьте, что заголовок `Server-Timing` содержит метрику '
+                f'`{metric.split(";")[0]}`.'
+            )
+        assert 'desc="0 queries"' not in timing, (
+            'Проверьте, что в `Server-Timing` учитываются SQL-запросы.'
+        )
+
+    def test_02_prometheus(self, admin_client, metrics_registry):
+        create_titles(admin_client)
+        metrics_registry.reset()
+        admin_client.get('/api/v1/titles/')
+        admin_client.get('/api/v1/titles/')
+        response = admin_client.get(self.url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что `{self.url}` доступен администратору.'
+        )
+        assert response['Content-Type'].startswith('text/plain'), (
+            f'Проверьте, что `{self.url}` отдаёт метрики в текстовом формате.'
+        )
+        content = response.content.decode()
+        labels = '{view="TitleViewSet",action="list"}'
+        assert f'api_requests_total{labels} 2' in content, (
+            'Проверьте, что число запросов считается по представлению и '
+            'действию.'
+        )
+        queries = next(
+            line for line in content.splitlines()
+            if line.startswith(f'api_db_queries_total{labels}')
+        )
+        assert int(queries.rsplit(' ', 1)[1]) > 0, (
+            'Проверьте, что SQL-запросы учитываются в метриках.'
+        )
+        assert (
+            f'api_request_duration_seconds_count{labels} 2' in content
+        ), 'Проверьте гистограмму времени ответа.'
+
+    def test_03_access(self, client, user_client, settings):
+        settings.METRICS_TOKEN = 'scrape-secret'
+        response = client.get(self.url, REMOTE_ADDR='127.0.0.1')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что `{self.url}` недоступен анонимному '
+            'пользователю, в том числе с локального адреса.'
+        )
+        response = user_client.get(self.url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{self.url}` недоступен пользователю без '
+            'роли администратора.'
+        )
+        response = client.get(
+            self.url, HTTP_AUTHORIZATION='Bearer scrape-secret'
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что `{self.url}` доступен с токеном '
+            '`METRICS_TOKEN`.'
+        )
+        response = client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что `{self.url}` не принимает неверный токен.'
+        )
+        settings.METRICS_TOKEN = None
+        response = client.get(self.url, HTTP_AUTHORIZATION='Bearer None')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что без `METRICS_TOKEN` метрики доступны только '
+            'администратору.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10QueryInspection:
+
+    def test_01_repeated_queries(self, admin_client):
+        from api.queries import QueryInspector
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        inspector = QueryInspector(repeat_limit=2)
+        with inspector.instrument():
+            for title in titles:
+                Title.objects.filter(id=title['id']).exists()
+        problems = inspector.problems()
+        assert len(problems) == 1 and problems[0].startswith(
+            f'{len(titles)} одинаковых запросов'
+        ), (
+            'Проверьте, что запросы, различающиеся только значениями, '
+            'считаются одинаковыми.'
+        )
+
+    def test_02_slow_queries(self, admin_client):
+        from api.queries import QueryInspector
+        from reviews.models import Title
+        inspector = QueryInspector(slow_threshold=1e-9)
+        with inspector.instrument():
+            Title.objects.count()
+        problems = inspector.problems()
+        assert len(problems) == 1 and 'медленный запрос' in problems[0], (
+            'Проверьте, что запросы дольше `SLOW_QUERY_THRESHOLD` '
+            'отмечаются как медленные.'
+        )
+
+    def test_03_log_mode(self, admin_client, admin, user, user_client,
+                         settings, caplog):
+        _, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        settings.QUERY_INSPECTION = 'log'
+        settings.QUERY_REPEAT_LIMIT = 1
+        with caplog.at_level(logging.WARNING, logger='api.queries'):
+            response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что в режиме `log` ответ не меняется.'
+        )
+        assert any(
+            url in record.getMessage() for record in caplog.records
+        ), 'Проверьте, что в режиме `log` проблемы пишутся в лог.'
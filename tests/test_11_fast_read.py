@@ -0,0 +1,73 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments
+
+TRICKY_TEXT = 'Кавычки " \\ / <b> \t\n\x01 \u2028 \u2029 \U0001f600'
+
+
+def render_variants(client, url, settings):
+    """Ответы по values() и обычным путём DRF, с orjson и без."""
+    from django.core.cache import cache
+    variants = {}
+    for compiled in (True, False):
+        for dumps in (None, 'json'):
+            settings.COMPILED_SERIALIZERS = compiled
+            settings.JSON_DUMPS = (
+                'tests.test_11_fast_read.no_fast_dumps' if dumps else None
+            )
+            cache.clear()
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            variants[(compiled, dumps)] = response.content
+    return variants
+
+
+def no_fast_dumps(data):
+    """Заставляет FastJSONRenderer использовать json из stdlib."""
+    raise TypeError
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11FastRead:
+
+    @pytest.fixture
+    def urls(self, admin_client, admin, user_client, user):
+        from reviews.models import Comment, Review, Title
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        Title.objects.filter(id=titles[1]['id']).update(category=None)
+        Title.objects.filter(id=titles[0]['id']).update(name=TRICKY_TEXT)
+        Review.objects.filter(id=reviews[0]['id']).update(text=TRICKY_TEXT)
+        Comment.objects.filter(id=comments[0]['id']).update(
+            text=TRICKY_TEXT
+        )
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        return [
+            '/api/v1/titles/',
+            reviews_url,
+            f'{reviews_url}?pagination=cursor',
+            f'{reviews_url}{reviews[0]["id"]}/comments/',
+        ]
+
+    def test_01_byte_identical(self, client, urls, settings):
+        for url in urls:
+            variants = render_variants(client, url, settings)
+            assert len(set(variants.values())) == 1, (
+                f'Проверьте, что ответ `{url}`, собранный из values() и '
+                'закодированный быстрым кодировщиком, совпадает с ответом '
+                'DRF байт в байт.'
+            )
+
+    def test_02_compiled_serializers(self):
+        from api.compiled import compile_serializer
+        from api.serializers import (CommentSerializer, ReviewSerializer,
+                                     TitleGetSerializer)
+        for serializer_class in (TitleGetSerializer, ReviewSerializer,
+                                 CommentSerializer):
+            assert compile_serializer(serializer_class) is not None, (
+                f'Проверьте, что `{serializer_class.__name__}` '
+                'компилируется для чтения из values().'
+            )
@@ -0,0 +1,95 @@
+from unittest import mock
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12Connections:
+
+    def test_sqlite_pragmas(self, settings):
+        from django.db import connection
+        from api.db import configure_sqlite
+        settings.SQLITE_PRAGMAS = {'busy_timeout': 1234}
+        connection.ensure_connection()
+        configure_sqlite(connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            timeout = cursor.fetchone()[0]
+        assert timeout == 1234, (
+            'Проверьте, что при новом соединении с SQLite выполняются '
+            'PRAGMA из настройки SQLITE_PRAGMAS.'
+        )
+
+    @pytest.mark.parametrize('usable', (True, False))
+    def test_broken_connection_closed(self, usable):
+        from django.db import connection
+        from api.db import check_connections
+        connection.ensure_connection()
+        with mock.patch.object(connection, 'is_usable', return_value=usable), \
+                mock.patch.object(connection, 'close') as close:
+            check_connections()
+        assert close.called is not usable, (
+            'Проверьте, что перед запросом неработающее постоянное '
+            'соединение закрывается, а работающее переиспользуется.'
+        )
+
+    @pytest.mark.parametrize('mode,failures', (
+        ('IMMEDIATE', 0), ('DEFERRED', 1)
+    ))
+    def test_read_then_write_transactions(self, tmp_path, settings, mode,
+                                          failures):
+        import threading
+        import time
+
+        from django.db import OperationalError
+        from django.db.utils import ConnectionHandler
+        settings.SQLITE_PRAGMAS = {
+            'journal_mode': 'wal', 'busy_timeout': 5000
+        }
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'api.backends.sqlite3',
+            'NAME': str(tmp_path / 'db.sqlite3'),
+            'OPTIONS': {'transaction_mode': mode},
+        }})
+        with handler['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE genre_title (title_id integer)')
+        handler['default'].close()
+        first_read = threading.Event()
+        errors = []
+
+        def write(title_id, delay):
+            # Как genre.set(): чтение связей, затем запись в той же
+            # транзакции
+            connection = handler['default']
+            try:
+                if not delay:
+                    first_read.wait()
+                connection._start_transaction_under_autocommit()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT count(*) FROM genre_title')
+                    if delay:
+                        first_read.set()
+                        time.sleep(delay)
+                    cursor.execute(
+                        'INSERT INTO genre_title VALUES (%s)', [title_id]
+                    )
+                connection.commit()
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                first_read.set()
+                connection.close()
+
+        threads = [
+            threading.Thread(target=write, args=(1, 0.2)),
+            threading.Thread(target=write, args=(2, 0)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == failures, (
+            'Проверьте, что транзакции SQLite берут блокировку на запись '
+            'при BEGIN (OPTIONS["transaction_mode"]), и конкурентная '
+            f'запись после чтения ждёт busy_timeout, а не падает: {errors}'
+        )
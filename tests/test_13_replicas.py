@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """Реплика - отдельный файл SQLite со схемой, но без новых данных."""
+    from django.core.management import call_command
+    from django.db import connections
+    connections.databases['replica'] = {
+        **connections.databases['default'],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    call_command('migrate', database='replica', verbosity=0)
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Replicas:
+
+    @pytest.fixture
+    def title(self, replica):
+        from reviews.models import Title
+        title = Title.objects.create(
+            name='Произведение', year=2000, description=''
+        )
+        Title.objects.using(replica).bulk_create([
+            Title(id=title.id, name=title.name, year=2000, description='')
+        ])
+        return title
+
+    def test_reads_from_replica(self, admin_client, user_client, title):
+        from django.core.cache import cache
+        from reviews.models import Review
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, data={'text': 'Текст', 'score': 5})
+        assert response.status_code == HTTPStatus.CREATED
+        assert Review.objects.using('default').count() == 1, (
+            'Проверьте, что запись идёт в основную базу.'
+        )
+        assert Review.objects.using('replica').count() == 0
+
+        response = user_client.get(url)
+        assert response.json()['count'] == 1, (
+            'Проверьте, что после записи автор читает с основной базы и '
+            'сразу видит свой отзыв.'
+        )
+        response = admin_client.get(url)
+        assert response.json()['count'] == 0, (
+            'Проверьте, что GET-запросы к отзывам читают с реплики.'
+        )
+        cache.clear()
+        response = user_client.get(url)
+        assert response.json()['count'] == 0, (
+            'Проверьте, что после окна REPLICA_PIN_SECONDS пользователь '
+            'снова читает с реплики.'
+        )
+
+    def test_failed_write_does_not_pin(self, admin, user_client, title):
+        from reviews.models import Review
+        Review.objects.create(title=title, author=admin, text='Текст', score=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, data={})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = user_client.get(url)
+        assert response.json()['count'] == 0, (
+            'Проверьте, что неуспешная запись не переключает пользователя '
+            'на основную базу.'
+        )
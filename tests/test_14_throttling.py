@@ -0,0 +1,115 @@
+import multiprocessing
+from http import HTTPStatus
+
+import pytest
+
+
+def drain_bucket(path, key, count):
+    from api.throttling import SharedBucketStore
+    store = SharedBucketStore(path, 64)
+    for _ in range(count):
+        store.consume(key, count, 1, 1000.0)
+
+
+@pytest.fixture
+def rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            'auth': '2/min', 'writes': '2/min', 'reads': '3/min'
+        },
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14Throttling:
+
+    def test_auth_throttled_by_ip(self, client, rates):
+        url = '/api/v1/auth/token/'
+        for _ in range(2):
+            response = client.post(url, data={})
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.post(url, data={})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что частые запросы к `{url}` ограничиваются '
+            'областью auth.'
+        )
+        assert int(response['Retry-After']) > 0, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After.'
+        )
+        response = client.post('/api/v1/auth/signup/', data={})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что регистрация и получение токена используют '
+            'общую корзину для IP-адреса.'
+        )
+
+    def test_auth_throttled_by_forwarded_ip(self, client, rates, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'NUM_PROXIES': 1
+        }
+        url = '/api/v1/auth/token/'
+        # Клиент подставляет свой X-Forwarded-For, прокси дописывает
+        # настоящий адрес в конец
+        for spoofed in ('1.1.1.1', '2.2.2.2'):
+            client.post(
+                url, data={}, HTTP_X_FORWARDED_FOR=f'{spoofed}, 10.0.0.1'
+            )
+        response = client.post(
+            url, data={}, HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.1'
+        )
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что за прокси (NUM_PROXIES) адрес клиента берётся '
+            'из X-Forwarded-For с конца, и подмена заголовка не обходит '
+            'ограничение.'
+        )
+        response = client.post(
+            url, data={}, HTTP_X_FORWARDED_FOR='10.0.0.2'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что за прокси (NUM_PROXIES) клиенты с разными '
+            'адресами в X-Forwarded-For ограничиваются отдельно.'
+        )
+
+    def test_reads_and_writes_per_user(self, user_client, admin_client,
+                                       rates):
+        url = '/api/v1/categories/'
+        for _ in range(3):
+            assert user_client.get(url).status_code == HTTPStatus.OK
+        assert user_client.get(url).status_code == (
+            HTTPStatus.TOO_MANY_REQUESTS
+        ), 'Проверьте, что чтение ограничивается областью reads.'
+        assert admin_client.get(url).status_code == HTTPStatus.OK, (
+            'Проверьте, что корзины отдельные для каждого пользователя.'
+        )
+        response = admin_client.post(url, data={'name': 'Фильм',
+                                                'slug': 'films'})
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что запись и чтение ограничиваются отдельно.'
+        )
+
+    def test_store_shared_between_processes(self, tmp_path):
+        from api.throttling import SharedBucketStore
+        path = str(tmp_path / 'throttle.bin')
+        process = multiprocessing.get_context('fork').Process(
+            target=drain_bucket, args=(path, 'key', 5)
+        )
+        process.start()
+        process.join()
+        store = SharedBucketStore(path, 64)
+        assert store.consume('key', 5, 1, 1000.0) == 1, (
+            'Проверьте, что корзина, опустошённая другим процессом, '
+            'пуста и в текущем.'
+        )
+        assert store.consume('other', 5, 1, 1000.0) == 0
+        assert store.consume('key', 5, 1, 1002.0) == 0, (
+            'Проверьте, что корзина пополняется со временем.'
+        )
+
+    def test_cache_store(self, settings, user_client, rates):
+        settings.THROTTLE_STORE_PATH = None
+        url = '/api/v1/categories/'
+        for _ in range(3):
+            assert user_client.get(url).status_code == HTTPStatus.OK
+        assert user_client.get(url).status_code == (
+            HTTPStatus.TOO_MANY_REQUESTS
+        ), 'Проверьте, что без THROTTLE_STORE_PATH корзины хранятся в кэше.'
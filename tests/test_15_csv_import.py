@@ -0,0 +1,287 @@
+import csv
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+import pytest
+
+from tests.conftest import MANAGE_PATH
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def categories_csv(path, rows):
+    return write_csv(path, ('id', 'name', 'slug'), rows)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15CsvImport:
+
+    def test_01_batches(self, tmp_path):
+        from api.management.importer import CsvImporter
+        from reviews.models import Category
+        path = categories_csv(tmp_path / 'category.csv', [
+            (idx, f'Категория {idx}', f'category-{idx}')
+            for idx in range(1, 6)
+        ])
+        progress = []
+        stats = CsvImporter(
+            Category, path, batch_size=2,
+            on_progress=lambda stats: progress.append(stats.rows)
+        ).run()
+        assert progress == [2, 4, 5], (
+            'Проверьте, что CSV-файл загружается пачками по `batch_size` '
+            'строк.'
+        )
+        assert (stats.rows, stats.created, stats.errors) == (5, 5, 0)
+        assert Category.objects.count() == 5
+
+    def test_02_bad_rows_reported(self, tmp_path):
+        from api.management.importer import CsvImporter
+        from reviews.models import Title
+        path = write_csv(
+            tmp_path / 'titles.csv', ('id', 'name', 'year', 'category_id'),
+            [
+                (1, 'Первое', 2000, ''),
+                (2, 'Второе', 'не год', ''),
+                (3, 'Третье', 2001, ''),
+                (4, 'Четвёртое', 2002, 999),
+                (5, 'Пятое', 2003, ''),
+            ]
+        )
+        errors = []
+        stats = CsvImporter(
+            Title, path, batch_size=2,
+            on_error=lambda line, error: errors.append(line)
+        ).run()
+        assert errors == [3, 5], (
+            'Проверьте, что при ошибке пачка загружается построчно, а номера '
+            'ошибочных строк файла передаются в `on_error`.'
+        )
+        assert (stats.rows, stats.created, stats.errors) == (5, 3, 2)
+        assert set(Title.objects.values_list('id', flat=True)) == {1, 3, 5}, (
+            'Проверьте, что ошибочные строки не мешают загрузке остальных '
+            'строк пачки.'
+        )
+
+    def test_03_command(self):
+        from django.core.management import call_command
+        from reviews.models import Comment, Review, Title
+        out = StringIO()
+        call_command('csv-in-bd', batch_size=7, stdout=out)
+        for model, file_name in ((Title, 'titles.csv'),
+                                 (Review, 'review.csv'),
+                                 (Comment, 'comments.csv')):
+            path = f'{MANAGE_PATH}/static/data/{file_name}'
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = sum(1 for _ in csv.DictReader(file))
+            assert model.objects.count() == rows, (
+                f'Проверьте, что команда `csv-in-bd` загружает все строки '
+                f'файла `{file_name}`.'
+            )
+        output = out.getvalue()
+        assert output.count('ошибок 0') == output.count('База заполнена') == 7
+        assert Title.objects.filter(rating__isnull=False).exists(), (
+            'Проверьте, что после загрузки пересчитывается рейтинг.'
+        )
+
+    def test_04_upsert(self, tmp_path):
+        from api.management.importer import UpsertCsvImporter
+        from reviews.models import Category
+        rows = [(1, 'Фильм', 'movie'), (2, 'Книга', 'book')]
+        path = categories_csv(tmp_path / 'category.csv', rows)
+        UpsertCsvImporter(Category, path).run()
+        path = categories_csv(tmp_path / 'category.csv', [
+            (1, 'Кино', 'movie'), (2, 'Книга', 'book'), (3, 'Музыка', 'music')
+        ])
+        errors = []
+        stats = UpsertCsvImporter(
+            Category, path, on_error=lambda line, error: errors.append(line)
+        ).run()
+        assert not errors and stats.created == 3, (
+            'Проверьте, что повторная загрузка файла в режиме upsert не '
+            'завершается ошибками по первичному ключу.'
+        )
+        assert dict(Category.objects.values_list('id', 'name')) == {
+            1: 'Кино', 2: 'Книга', 3: 'Музыка'
+        }, 'Проверьте, что режим upsert обновляет существующие строки.'
+
+    def test_05_upsert_unique_conflict(self, tmp_path):
+        from api.management.importer import UpsertCsvImporter
+        from reviews.models import Category
+        path = categories_csv(
+            tmp_path / 'category.csv', [(1, 'Фильм', 'movie')]
+        )
+        UpsertCsvImporter(Category, path).run()
+        path = categories_csv(tmp_path / 'category.csv', [
+            (2, 'Кино', 'movie'), (3, 'Книга', 'book')
+        ])
+        errors = []
+        stats = UpsertCsvImporter(
+            Category, path, on_error=lambda line, error: errors.append(line)
+        ).run()
+        assert errors == [2] and stats.created == 1, (
+            'Проверьте, что строка с новым id и занятым slug попадает в '
+            'ошибки, а остальные строки загружаются.'
+        )
+        assert dict(Category.objects.values_list('id', 'slug')) == {
+            1: 'movie', 3: 'book'
+        }
+
+    def test_06_parallel_load_order(self):
+        from api.management.importer import dependency_graph, load_in_parallel
+        from reviews.models import Category, Comment, Genre, Review, Title
+        from users.models import User
+        models = [Title.genre.through, Comment, Review, Title, Genre,
+                  Category, User]
+        graph = dependency_graph(models)
+        assert graph[Title] == {Category} and graph[Review] == {Title, User}
+        assert graph[Title.genre.through] == {Title, Genre}
+
+        events, lock = [], threading.Lock()
+
+        def load(model):
+            with lock:
+                events.append(('start', model))
+            time.sleep(0.01)
+            with lock:
+                events.append(('end', model))
+
+        load_in_parallel(models, load, workers=4)
+        assert {model for _, model in events} == set(models)
+        for model, dependencies in graph.items():
+            started = events.index(('start', model))
+            assert all(
+                events.index(('end', dependency)) < started
+                for dependency in dependencies
+            ), (
+                f'Проверьте, что {model.__name__} загружается только после '
+                'моделей, на которые ссылается.'
+            )
+        assert events.index(('start', Genre)) < events.index(('end', User)), (
+            'Проверьте, что независимые таблицы загружаются одновременно.'
+        )
+
+    def test_07_parallel_load_cycle(self):
+        from api.management.importer import load_in_parallel
+        from reviews.models import Category, Genre
+        loaded = []
+        with mock.patch(
+            'api.management.importer.dependency_graph',
+            return_value={Category: {Genre}, Genre: {Category}}
+        ):
+            with pytest.raises(ValueError, match='Циклическая зависимость'):
+                load_in_parallel([Category, Genre], loaded.append, workers=2)
+        assert not loaded
+
+    def test_08_staging_clean(self, tmp_path):
+        from api.management.importer import StagingCsvImporter
+        from reviews.models import Category
+        path = categories_csv(tmp_path / 'category.csv', [
+            (idx, f'Категория {idx}', f'category-{idx}')
+            for idx in range(1, 8)
+        ])
+        errors = []
+        stats = StagingCsvImporter(
+            Category, path, batch_size=3,
+            on_error=lambda line, error: errors.append(line)
+        ).run()
+        assert not errors and (stats.rows, stats.created) == (7, 7), (
+            'Проверьте, что загрузка через временную таблицу переносит все '
+            'строки файла без нарушений.'
+        )
+        assert sorted(Category.objects.values_list('id', flat=True)) == [
+            1, 2, 3, 4, 5, 6, 7
+        ]
+
+    def test_09_staging_violations(self, tmp_path):
+        from api.management.importer import StagingCsvImporter
+        from reviews.models import Category, Title
+        Category.objects.create(id=1, name='Фильм', slug='movie')
+        path = categories_csv(tmp_path / 'category.csv', [
+            (2, 'Книга', 'book'),
+            (3, 'Кино', 'movie'),
+            (4, 'Музыка', 'music'),
+            (5, 'Книги', 'book'),
+        ])
+        errors = {}
+        stats = StagingCsvImporter(
+            Category, path, batch_size=2,
+            on_error=lambda line, error: errors.update({line: error})
+        ).run()
+        assert set(errors) == {3, 5} and stats.created == 2
+        assert 'уже есть в базе' in errors[3], (
+            'Проверьте, что строка, повторяющая запись в базе, попадает в '
+            'отчёт.'
+        )
+        assert 'внутри файла' in errors[5], (
+            'Проверьте, что повтор уникального значения внутри файла '
+            'попадает в отчёт, а первая такая строка загружается.'
+        )
+        assert set(Category.objects.values_list('slug', flat=True)) == {
+            'movie', 'book', 'music'
+        }
+
+        path = write_csv(
+            tmp_path / 'titles.csv', ('id', 'name', 'year', 'category_id'),
+            [(1, 'Первое', 2000, 2), (2, 'Второе', 2001, 999)]
+        )
+        errors = {}
+        stats = StagingCsvImporter(
+            Title, path, on_error=lambda line, error: errors.update(
+                {line: error}
+            )
+        ).run()
+        assert list(errors) == [3] and 'category_id' in errors[3], (
+            'Проверьте, что строка со ссылкой на несуществующую запись '
+            'попадает в отчёт.'
+        )
+        assert list(Title.objects.values_list('id', flat=True)) == [1]
+
+    def test_10_staging_column_constraints(self, tmp_path):
+        from api.management.importer import StagingCsvImporter
+        from reviews.models import Review, Title
+        path = write_csv(
+            tmp_path / 'titles.csv', ('id', 'name', 'year'),
+            [(1, 'Первое', 2000), (2, 'Второе', -5), (3, 'Третье', 2001)]
+        )
+        errors = {}
+        stats = StagingCsvImporter(
+            Title, path, on_error=lambda line, error: errors.update(
+                {line: error}
+            )
+        ).run()
+        assert list(errors) == [3] and 'year' in errors[3], (
+            'Проверьте, что строка, нарушающая CHECK колонки (отрицательный '
+            'год), попадает в отчёт.'
+        )
+        assert stats.created == 2 and sorted(
+            Title.objects.values_list('id', flat=True)
+        ) == [1, 3], (
+            'Проверьте, что строки с нарушениями не прерывают загрузку '
+            'остальных.'
+        )
+
+        # В файле нет колонки автора: внешний ключ остаётся NULL
+        path = write_csv(
+            tmp_path / 'review.csv', ('id', 'title_id', 'text', 'score'),
+            [(1, 1, 'Отзыв', 5)]
+        )
+        errors = {}
+        stats = StagingCsvImporter(
+            Review, path, on_error=lambda line, error: errors.update(
+                {line: error}
+            )
+        ).run()
+        assert list(errors) == [2] and 'author_id' in errors[2], (
+            'Проверьте, что строка с пустым обязательным внешним ключом '
+            'попадает в отчёт, а не прерывает загрузку.'
+        )
+        assert stats.created == 0 and not Review.objects.exists()